@@ -0,0 +1,66 @@
+"""
+Per-worker view of admin wallet roles, versioned like the collections cache
+"""
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from .db_models import AdminWalletDB, DBRunner, bump_cache_version, get_cache_version
+
+ADMIN_WALLETS_VERSION_KEY = "admin_wallets"
+# How long a worker trusts its last read of the admin-wallets version. Changes
+# made by this worker apply at once; other workers see them within this window.
+ADMIN_ROLES_CHECK_INTERVAL = float(os.getenv("ADMIN_ROLES_CHECK_INTERVAL", "1"))
+
+def _load_roles(db: Session) -> Tuple[int, Dict[str, str]]:
+    # Version first, as in CollectionsCache.get.
+    version = get_cache_version(db, ADMIN_WALLETS_VERSION_KEY)
+    rows = db.query(AdminWalletDB.wallet_address, AdminWalletDB.role).all()
+    return version, {wallet: role.value for wallet, role in rows}
+
+class AdminRoleCache:
+    """Answers role checks from JWT claims whenever the admin set is unchanged.
+
+    Tokens carry the admin-wallets version (``av``) current when they were
+    issued. While that is still the current version the token's ``role``
+    claim is authoritative; once any admin wallet is added or removed, roles
+    come from a per-version snapshot of ``admin_wallets`` instead, so a
+    revoked wallet loses access without waiting for its token to expire.
+    """
+
+    def __init__(self, check_interval: float = ADMIN_ROLES_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._roles: Optional[Tuple[int, Dict[str, str]]] = None
+
+    async def version(self, db: DBRunner) -> int:
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.check_interval:
+            self._version = await db.run(get_cache_version, ADMIN_WALLETS_VERSION_KEY)
+            self._checked_at = now
+        return self._version
+
+    async def fresh_version(self, db: DBRunner) -> int:
+        """Read the version from the database, bypassing the check interval"""
+        self._version = None
+        return await self.version(db)
+
+    async def role_for(self, db: DBRunner, claims: Dict[str, Any]) -> Optional[str]:
+        """Current role of the token's wallet, or None if it is no longer an admin"""
+        version = await self.version(db)
+        if claims.get("av") == version and claims.get("role"):
+            return claims["role"]
+        roles = self._roles
+        if roles is None or roles[0] < version:
+            roles = await db.run(_load_roles)
+            self._roles = roles
+        return roles[1].get(claims.get("sub"))
+
+    def invalidate(self, db: Session):
+        """Mark admin wallets as changed; call before committing the write"""
+        bump_cache_version(db, ADMIN_WALLETS_VERSION_KEY)
+        self._version = None
+        self._roles = None
+
+admin_roles = AdminRoleCache()
@@ -1,9 +1,15 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from .admin_roles import admin_roles
+from .cache import TTLCache
+from .db_models import DBRunner, get_db_runner
+import os
+import time
 
 SECRET_KEY = "your-secret-key-change-in-production-09876543210"
 ALGORITHM = "HS256"
@@ -11,8 +17,20 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 480
 
 security = HTTPBearer()
 
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
 ADMIN_USERNAME = "admin"
-ADMIN_PASSWORD_HASH = bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Precompute with bcrypt.hashpw(...) and set ADMIN_PASSWORD_HASH to skip
+# hashing the default password (about 250 ms) on first use.
+ADMIN_PASSWORD_HASH = os.getenv("ADMIN_PASSWORD_HASH")
+
+@lru_cache(maxsize=1)
+def admin_password_hash() -> str:
+    if ADMIN_PASSWORD_HASH:
+        return ADMIN_PASSWORD_HASH
+    return bcrypt.hashpw("admin123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
@@ -27,24 +45,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def _credentials_error(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """Verified claims of a token, decoded once and cached until it expires"""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-            )
-        return username
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
+        raise _credentials_error()
+    if claims.get("sub") is None:
+        raise _credentials_error()
+    ttl = claims["exp"] - time.time() if "exp" in claims else None
+    token_cache.set(token, claims, ttl)
+    return claims
+
+async def verify_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: DBRunner = Depends(get_db_runner)
+) -> Dict[str, Any]:
+    """Token claims with ``role`` replaced by the wallet's current role"""
+    claims = decode_token(credentials.credentials)
+    role = await admin_roles.role_for(db, claims)
+    if role is None:
+        raise _credentials_error("Admin wallet is no longer authorized")
+    return {**claims, "role": role}
+
+async def verify_token(claims: Dict[str, Any] = Depends(verify_token_claims)) -> str:
+    return claims["sub"]
 
 def authenticate_admin(username: str, password: str) -> bool:
     if username != ADMIN_USERNAME:
         return False
-    return verify_password(password, ADMIN_PASSWORD_HASH)
+    return verify_password(password, admin_password_hash())
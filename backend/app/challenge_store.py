@@ -0,0 +1,232 @@
+"""
+Storage backends for wallet sign-in challenges
+"""
+import asyncio
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .db_models import AuthChallengeDB, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# "db" shares challenges between workers; "memory" is enough for one process.
+CHALLENGE_STORE = os.getenv("CHALLENGE_STORE", "db").lower()
+CHALLENGE_MEMORY_MAX = int(os.getenv("CHALLENGE_MEMORY_MAX", "100000"))
+CHALLENGE_PURGE_INTERVAL = float(os.getenv("CHALLENGE_PURGE_INTERVAL", "60"))
+CHALLENGE_PURGE_BATCH = int(os.getenv("CHALLENGE_PURGE_BATCH", "1000"))
+
+@dataclass(frozen=True)
+class Challenge:
+    id: str
+    wallet_address: str
+    nonce: str
+    message: str
+    expires_at: datetime
+    used: bool = False
+
+class ChallengeStore(ABC):
+    """Interface shared by the challenge backends.
+
+    ``db`` is the request's session; backends that keep no rows ignore it.
+    """
+
+    @abstractmethod
+    def save(self, db: Session, challenge: Challenge) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, db: Session, challenge_id: str) -> Optional[Challenge]:
+        ...
+
+    @abstractmethod
+    def consume(self, db: Session, challenge_id: str, wallet_address: str) -> Optional[Challenge]:
+        """Atomically mark an unused, unexpired challenge as used and return it"""
+
+    @abstractmethod
+    def purge(self) -> int:
+        """Drop expired and used challenges, returning how many were removed"""
+
+class MemoryChallengeStore(ChallengeStore):
+    """Process-local challenges that expire on their own.
+
+    Challenges all share the same lifetime, so insertion order is expiry
+    order: purging stops at the first live entry, and when the store is full
+    the oldest challenge is evicted first.
+    """
+
+    def __init__(self, maxsize: int = CHALLENGE_MEMORY_MAX):
+        self.maxsize = maxsize
+        self._challenges: "OrderedDict[str, Challenge]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, db: Session, challenge: Challenge) -> None:
+        with self._lock:
+            if len(self._challenges) >= self.maxsize:
+                self._purge_expired(datetime.utcnow())
+            while len(self._challenges) >= self.maxsize:
+                self._challenges.popitem(last=False)
+            self._challenges[challenge.id] = challenge
+
+    def get(self, db: Session, challenge_id: str) -> Optional[Challenge]:
+        with self._lock:
+            return self._challenges.get(challenge_id)
+
+    def consume(self, db: Session, challenge_id: str, wallet_address: str) -> Optional[Challenge]:
+        with self._lock:
+            challenge = self._challenges.get(challenge_id)
+            if (
+                challenge is None
+                or challenge.used
+                or challenge.wallet_address != wallet_address
+                or challenge.expires_at <= datetime.utcnow()
+            ):
+                return None
+            # Kept (as used) until it expires so replays are reported as such.
+            self._challenges[challenge_id] = replace(challenge, used=True)
+            return challenge
+
+    def _purge_expired(self, now: datetime) -> int:
+        removed = 0
+        while self._challenges:
+            challenge = next(iter(self._challenges.values()))
+            if challenge.expires_at > now:
+                break
+            self._challenges.popitem(last=False)
+            removed += 1
+        return removed
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._purge_expired(datetime.utcnow())
+
+    def __len__(self) -> int:
+        return len(self._challenges)
+
+class DBChallengeStore(ChallengeStore):
+    """Challenges kept in ``auth_challenges`` so every worker sees them"""
+
+    def __init__(self, purge_batch: int = CHALLENGE_PURGE_BATCH):
+        self.purge_batch = purge_batch
+
+    @staticmethod
+    def _from_row(row) -> Challenge:
+        return Challenge(
+            id=row.id,
+            wallet_address=row.wallet_address,
+            nonce=row.nonce,
+            message=row.message,
+            expires_at=row.expires_at,
+            used=row.used,
+        )
+
+    def save(self, db: Session, challenge: Challenge) -> None:
+        db.add(AuthChallengeDB(
+            id=challenge.id,
+            wallet_address=challenge.wallet_address,
+            nonce=challenge.nonce,
+            message=challenge.message,
+            expires_at=challenge.expires_at,
+            used=False
+        ))
+        db.commit()
+
+    def get(self, db: Session, challenge_id: str) -> Optional[Challenge]:
+        row = db.query(AuthChallengeDB).filter(AuthChallengeDB.id == challenge_id).first()
+        return self._from_row(row) if row is not None else None
+
+    def consume(self, db: Session, challenge_id: str, wallet_address: str) -> Optional[Challenge]:
+        # Compare-and-set: of two concurrent verifications only one matches
+        # ``used = false``, so a challenge can never be redeemed twice.
+        row = db.execute(
+            update(AuthChallengeDB)
+            .where(
+                AuthChallengeDB.id == challenge_id,
+                AuthChallengeDB.wallet_address == wallet_address,
+                AuthChallengeDB.used.is_(False),
+                AuthChallengeDB.expires_at > datetime.utcnow(),
+            )
+            .values(used=True)
+            .returning(
+                AuthChallengeDB.id,
+                AuthChallengeDB.wallet_address,
+                AuthChallengeDB.nonce,
+                AuthChallengeDB.message,
+                AuthChallengeDB.expires_at,
+                AuthChallengeDB.used,
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        return self._from_row(row) if row is not None else None
+
+    def purge(self) -> int:
+        """Delete expired/used challenges ``purge_batch`` rows per transaction"""
+        removed = 0
+        db = SessionLocal()
+        try:
+            while True:
+                stale = (
+                    select(AuthChallengeDB.id)
+                    .where((AuthChallengeDB.expires_at <= datetime.utcnow()) | AuthChallengeDB.used.is_(True))
+                    .limit(self.purge_batch)
+                )
+                result = db.execute(
+                    delete(AuthChallengeDB)
+                    .where(AuthChallengeDB.id.in_(stale.scalar_subquery()))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+                removed += result.rowcount
+                if result.rowcount < self.purge_batch:
+                    return removed
+        finally:
+            db.close()
+
+def build_challenge_store(kind: str = CHALLENGE_STORE) -> ChallengeStore:
+    if kind == "memory":
+        return MemoryChallengeStore()
+    if kind == "db":
+        return DBChallengeStore()
+    raise ValueError(f"Unknown CHALLENGE_STORE: {kind}")
+
+challenge_store = build_challenge_store()
+
+class ChallengePurger:
+    """Periodically purges the challenge store in the background"""
+
+    def __init__(self, store: ChallengeStore, interval: float = CHALLENGE_PURGE_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self.purged = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.purged += await run_in_threadpool(self.store.purge)
+            except Exception as e:
+                logger.error(f"Challenge purge failed: {str(e)}")
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+challenge_purger = ChallengePurger(challenge_store)
@@ -0,0 +1,77 @@
+"""
+Whitelist change feed: inserts and clear tombstones by sequence number
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import and_, insert, literal, select
+from sqlalchemy.orm import Session
+from .db_models import WhitelistChangeDB, WhitelistEntryDB
+from .whitelist_query import ENTRY_COLUMNS, ENTRY_FIELDS
+
+CHANGE_FEED_PAGE_DEFAULT = 1000
+CHANGE_FEED_PAGE_MAX = 10000
+# Largest integer SQLite and Postgres accept as a query parameter.
+MAX_SEQ = 2 ** 63 - 1
+
+def encode_change_cursor(seq: int) -> str:
+    raw = json.dumps(["changes", seq]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_change_cursor(cursor: str) -> int:
+    """Raises ValueError for anything that is not a change cursor we issued"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        kind, seq = json.loads(raw)
+        if kind != "changes" or not isinstance(seq, int) or isinstance(seq, bool) or not 0 <= seq <= MAX_SEQ:
+            raise ValueError(cursor)
+        return seq
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def log_inserts(db: Session, rows: Iterable[Dict[str, Any]]):
+    """Append inserted entries to the feed; call after bumping the whitelist version"""
+    now = datetime.utcnow()
+    changes = [
+        {"op": "insert", "entry_id": row["id"], "wallet_address": row["wallet_address"], "created_at": now}
+        for row in rows
+    ]
+    if changes:
+        db.execute(insert(WhitelistChangeDB.__table__), changes)
+
+def log_clear(db: Session):
+    """Append a tombstone for every entry about to be deleted by a clear"""
+    db.execute(insert(WhitelistChangeDB.__table__).from_select(
+        ["op", "entry_id", "wallet_address", "created_at"],
+        select(literal("delete"), WhitelistEntryDB.id, WhitelistEntryDB.wallet_address, literal(datetime.utcnow()))
+        .order_by(WhitelistEntryDB.created_at, WhitelistEntryDB.id)
+    ))
+
+def read_changes(db: Session, after: int, limit: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """Changes after sequence ``after``: (changes, last sequence read, more pending).
+
+    Inserts carry the full entry, joined from ``whitelist_entries``; those
+    whose entry has been cleared since are skipped, as the tombstone that
+    follows makes them moot.
+    """
+    rows = (
+        db.query(WhitelistChangeDB.seq, WhitelistChangeDB.op, WhitelistChangeDB.entry_id,
+                 WhitelistChangeDB.wallet_address, *ENTRY_COLUMNS)
+        .outerjoin(WhitelistEntryDB, and_(
+            WhitelistChangeDB.op == "insert", WhitelistEntryDB.id == WhitelistChangeDB.entry_id
+        ))
+        .filter(WhitelistChangeDB.seq > after)
+        .order_by(WhitelistChangeDB.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = []
+    for seq, op, entry_id, wallet_address, *entry in rows:
+        if op == "delete":
+            changes.append({"op": "delete", "id": entry_id, "wallet_address": wallet_address})
+        elif entry[0] is not None:
+            changes.append({"op": "insert", "entry": dict(zip(ENTRY_FIELDS, entry))})
+    return changes, rows[-1].seq if rows else after, has_more
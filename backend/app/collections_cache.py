@@ -0,0 +1,78 @@
+"""
+Versioned in-process cache of tracked NFT collections
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from .db_models import NFTCollectionDB, get_cache_version, bump_cache_version
+from .models import NFTCollection
+from .xrpl_service import CollectionMatcher
+
+COLLECTIONS_VERSION_KEY = "collections"
+
+_collections_adapter = TypeAdapter(List[NFTCollection])
+
+@dataclass(frozen=True)
+class CollectionsSnapshot:
+    version: int
+    collections: List[NFTCollection]
+    matcher: CollectionMatcher
+    body: bytes
+    etag: str
+
+class CollectionsCache:
+    """Caches the collections table per worker, keyed by a DB version counter.
+
+    Every write to ``nft_collections`` bumps the ``collections`` row in
+    ``cache_versions`` in the same transaction, so each worker notices the
+    change on its next read with a single primary-key lookup.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CollectionsSnapshot] = None
+
+    def get(self, db: Session) -> CollectionsSnapshot:
+        # Read the version before the rows: a concurrent write can only make
+        # the snapshot newer than its label, which forces a reload next time.
+        version = get_cache_version(db, COLLECTIONS_VERSION_KEY)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            snapshot = self._load(db, version)
+            self._snapshot = snapshot
+        return snapshot
+
+    def _load(self, db: Session, version: int) -> CollectionsSnapshot:
+        rows = db.query(NFTCollectionDB).order_by(NFTCollectionDB.created_at.desc()).all()
+        collections = [NFTCollection(
+            id=c.id,
+            name=c.name,
+            issuer=c.issuer,
+            taxon=c.taxon,
+            created_at=c.created_at
+        ) for c in rows]
+        body = _collections_adapter.dump_json(collections)
+        return CollectionsSnapshot(
+            version=version,
+            collections=collections,
+            matcher=CollectionMatcher.from_rows(rows),
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        )
+
+    def invalidate(self, db: Session):
+        """Mark collections as changed; call before committing the write"""
+        bump_cache_version(db, COLLECTIONS_VERSION_KEY)
+        self._snapshot = None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+collections_cache = CollectionsCache()
@@ -1,27 +1,139 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Enum, create_engine
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Enum, Index, create_engine, delete, event, insert, inspect, literal, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from .metrics import METRICS_ENABLED, instrument_engine
+from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import Callable, TypeVar
 import os
 import enum
+import random
+import uuid
+import zlib
+
+T = TypeVar("T")
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Serve endpoints through an AsyncSession on aiosqlite / psycopg async.
+# The sync engine stays available for background jobs and streaming exports.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Engine tuning profile: "sqlite", "postgres", "default" (driver defaults)
+# or "auto" to pick from the DATABASE_URL scheme.
+DB_PROFILE = os.getenv("DB_PROFILE", "auto")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# "startup" prepares the schema when a worker starts (a single lookup once the
+# database is current); "skip" leaves it to `python -m app.startup --init-db`.
+DB_INIT = os.getenv("DB_INIT", "startup").lower()
+SUPER_ADMIN_WALLET = os.getenv("SUPER_ADMIN_WALLET", "rKhHA3suVVRtJpUQE5vZntyMTWvd9hBxg1")
+INIT_FINGERPRINT_KEY = "init"
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching asyncio driver"""
+    scheme, sep, rest = url.partition("://")
+    driver = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgres": "postgresql+psycopg",
+        "postgresql": "postgresql+psycopg",
+        "postgresql+psycopg2": "postgresql+psycopg",
+    }.get(scheme, scheme)
+    return f"{driver}{sep}{rest}"
+
+def database_profile(url: str = DATABASE_URL) -> str:
+    if DB_PROFILE != "auto":
+        return DB_PROFILE
+    if url.startswith("sqlite"):
+        return "sqlite"
+    if url.startswith("postgres"):
+        return "postgres"
+    return "default"
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.rstrip("/").endswith(":memory:") or url.rstrip("/") in ("sqlite:", "sqlite+aiosqlite:")
+
+def _engine_options(url: str, profile: str) -> dict:
+    options = {}
+    if url.startswith("sqlite") and "aiosqlite" not in url:
+        options["connect_args"] = {"check_same_thread": False}
+    if profile == "postgres" or (profile == "sqlite" and not _is_memory_sqlite(url)):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    if profile == "postgres":
+        options.update(pool_pre_ping=DB_POOL_PRE_PING, pool_recycle=DB_POOL_RECYCLE)
+    return options
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    finally:
+        cursor.close()
+
+def configure_engine(sync_engine, profile: str):
+    """Install per-connection tuning hooks for the selected profile"""
+    if METRICS_ENABLED:
+        instrument_engine(sync_engine)
+    if profile == "sqlite":
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+_profile = database_profile()
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, _profile))
+configure_engine(engine, _profile)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    _async_url = async_database_url(DATABASE_URL)
+    async_engine = create_async_engine(_async_url, **_engine_options(_async_url, _profile))
+    configure_engine(async_engine.sync_engine, _profile)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def email_domain_of(email: str) -> str:
+    return email.rpartition("@")[2].lower()
+
+def _default_email_domain(context):
+    return email_domain_of(context.get_current_parameters()["email"])
+
 class WhitelistEntryDB(Base):
     __tablename__ = "whitelist_entries"
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_whitelist_entries_created_at_id", "created_at", "id"),
+        Index("ix_whitelist_entries_country_created_at", "country", "created_at"),
+        Index("ix_whitelist_entries_email_domain_created_at", "email_domain", "created_at"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     full_name = Column(String, nullable=False)
     email = Column(String, nullable=False, index=True)
+    email_domain = Column(String, nullable=True, default=_default_email_domain)  # lower-cased part after "@"
     wallet_address = Column(String, nullable=False, unique=True, index=True)
     street_address = Column(String, nullable=False)
     city = Column(String, nullable=False)
@@ -64,27 +176,185 @@ class AuthChallengeDB(Base):
     used = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+class CacheVersionDB(Base):
+    __tablename__ = "cache_versions"
+    
+    name = Column(String, primary_key=True)  # e.g. "collections"
+    version = Column(Integer, nullable=False, default=0)
+
+class NFTHoldingDB(Base):
+    __tablename__ = "nft_holdings"
+    
+    nft_id = Column(String, primary_key=True)
+    owner = Column(String, nullable=False, index=True)
+    issuer = Column(String, nullable=False)
+    taxon = Column(Integer, nullable=False)
+    uri = Column(String, nullable=True)
+    flags = Column(Integer, nullable=False, default=0)
+    ledger_index = Column(Integer, nullable=False)  # ledger of the last change seen
+
+class NFTIndexStateDB(Base):
+    __tablename__ = "nft_index_state"
+    
+    name = Column(String, primary_key=True)  # e.g. "holders"
+    ledger_index = Column(Integer, nullable=False)  # last ledger applied to nft_holdings
+    collections_version = Column(Integer, nullable=False)  # collections the index was built for
+    synced_at = Column(DateTime, nullable=False)  # last time the index reached the validated ledger
+
+class WhitelistChangeDB(Base):
+    __tablename__ = "whitelist_changes"
+    # AUTOINCREMENT so SQLite never hands out a sequence number twice.
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    seq = Column(Integer, primary_key=True, autoincrement=True)  # change feed position
+    op = Column(String, nullable=False)  # "insert" or "delete"
+    entry_id = Column(String, nullable=False)
+    wallet_address = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class WhitelistStatDB(Base):
+    __tablename__ = "whitelist_stats"
+    
+    dimension = Column(String, primary_key=True)  # "total", "country" or "hour"
+    key = Column(String, primary_key=True)  # country, hour start ("2024-01-01T13:00:00") or "" for the total
+    count = Column(Integer, nullable=False, default=0)
+
+def get_cache_version(db, name: str) -> int:
+    """Read the shared version counter for a cached data set"""
+    version = db.query(CacheVersionDB.version).filter(CacheVersionDB.name == name).scalar()
+    return version or 0
+
+def bump_cache_version(db, name: str):
+    """Increment a version counter inside the caller's transaction.
+
+    New counters start at a random value, so a recreated database does not
+    repeat an earlier one's versions (or the export file names keyed on them).
+    """
+    # A single upsert, so two first writes cannot both try to insert the row.
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    table = CacheVersionDB.__table__
+    stmt = dialect.insert(table).values(name=name, version=random.randrange(1, 2 ** 30))
+    db.execute(stmt.on_conflict_do_update(index_elements=["name"], set_={"version": table.c.version + 1}))
+
+def _upgrade_schema(conn):
+    """Add columns and indexes introduced after a table was first created.
+
+    ``create_all`` only creates missing tables, so databases from earlier
+    releases are brought up to date here.
+    """
+    inspector = inspect(conn)
+    columns = {c["name"] for c in inspector.get_columns("whitelist_entries")}
+    if "email_domain" not in columns:
+        conn.execute(text("ALTER TABLE whitelist_entries ADD COLUMN email_domain VARCHAR"))
+        while True:
+            rows = conn.execute(text(
+                "SELECT id, email FROM whitelist_entries WHERE email_domain IS NULL LIMIT 1000"
+            )).all()
+            if not rows:
+                break
+            conn.execute(
+                text("UPDATE whitelist_entries SET email_domain = :domain WHERE id = :id"),
+                [{"id": row.id, "domain": email_domain_of(row.email)} for row in rows]
+            )
+
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=conn, checkfirst=True)
+
+    # Entries stored before the change feed existed open it as inserts.
+    if conn.execute(select(WhitelistChangeDB.seq).limit(1)).first() is None:
+        conn.execute(insert(WhitelistChangeDB).from_select(
+            ["op", "entry_id", "wallet_address", "created_at"],
+            select(literal("insert"), WhitelistEntryDB.id, WhitelistEntryDB.wallet_address, WhitelistEntryDB.created_at)
+            .order_by(WhitelistEntryDB.created_at, WhitelistEntryDB.id)
+        ))
+
+def _create_schema(conn):
+    Base.metadata.create_all(bind=conn)
+    _upgrade_schema(conn)
+
+def _init_fingerprint() -> int:
+    """Checksum of the declared tables, columns and indexes plus bootstrap settings"""
+    parts = [SUPER_ADMIN_WALLET]
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    return zlib.crc32("|".join(parts).encode("utf-8")) & 0x7FFFFFFF
+
+def _init_is_current(conn) -> bool:
+    """Whether ``init_db`` already ran against this database for this release"""
+    try:
+        version = conn.execute(
+            select(CacheVersionDB.version).where(CacheVersionDB.name == INIT_FINGERPRINT_KEY)
+        ).scalar()
+    except DBAPIError:
+        # Fresh database without cache_versions.
+        return False
+    return version == _init_fingerprint()
+
+def _record_init(conn):
+    conn.execute(delete(CacheVersionDB).where(CacheVersionDB.name == INIT_FINGERPRINT_KEY))
+    conn.execute(insert(CacheVersionDB).values(name=INIT_FINGERPRINT_KEY, version=_init_fingerprint()))
+
+def _bootstrap_super_admin(db: Session):
+    super_admin_wallet = SUPER_ADMIN_WALLET
+    existing = db.query(AdminWalletDB).filter(AdminWalletDB.wallet_address == super_admin_wallet).first()
+    if not existing:
+        admin = AdminWalletDB(
+            id=str(uuid.uuid4()),
+            wallet_address=super_admin_wallet,
+            role=AdminRole.super_admin,
+            added_by=None
+        )
+        db.add(admin)
+        db.commit()
+        print(f"✅ Bootstrapped super admin wallet: {super_admin_wallet}")
+
+def init_db(force: bool = False):
+    """Create/upgrade the schema and bootstrap the super admin.
+
+    Skipped after one lookup when the database was already initialised with
+    the same schema and settings; ``force`` runs every step regardless.
+    """
+    if not force:
+        with engine.connect() as conn:
+            if _init_is_current(conn):
+                return
+    
+    with engine.begin() as conn:
+        _create_schema(conn)
     
-    from sqlalchemy.orm import Session
     db = SessionLocal()
     try:
-        super_admin_wallet = os.getenv("SUPER_ADMIN_WALLET", "rKhHA3suVVRtJpUQE5vZntyMTWvd9hBxg1")
-        existing = db.query(AdminWalletDB).filter(AdminWalletDB.wallet_address == super_admin_wallet).first()
-        if not existing:
-            import uuid
-            admin = AdminWalletDB(
-                id=str(uuid.uuid4()),
-                wallet_address=super_admin_wallet,
-                role=AdminRole.super_admin,
-                added_by=None
-            )
-            db.add(admin)
-            db.commit()
-            print(f"✅ Bootstrapped super admin wallet: {super_admin_wallet}")
+        _bootstrap_super_admin(db)
     finally:
         db.close()
+    
+    with engine.begin() as conn:
+        _record_init(conn)
+
+async def init_db_async(force: bool = False):
+    """``init_db`` for DATABASE_ASYNC mode, run on the async engine"""
+    if not force:
+        async with async_engine.connect() as conn:
+            if await conn.run_sync(_init_is_current):
+                return
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+    
+    async with AsyncSessionLocal() as session:
+        await session.run_sync(_bootstrap_super_admin)
+    
+    async with async_engine.begin() as conn:
+        await conn.run_sync(_record_init)
+
+async def close_db_async():
+    if async_engine is not None:
+        await async_engine.dispose()
 
 def get_db():
     db = SessionLocal()
@@ -92,3 +362,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+class DBRunner(ABC):
+    """Runs blocking ORM code for an endpoint without stalling the event loop.
+
+    Endpoints hand ``run`` a plain function taking a sync ``Session`` as its
+    first argument, so the same code serves both database modes.
+    """
+
+    @abstractmethod
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        ...
+
+class ThreadedDBRunner(DBRunner):
+    """Sync engine: the function runs on the threadpool"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+class AsyncDBRunner(DBRunner):
+    """Async engine: the function runs on the loop over a non-blocking driver"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self.session.run_sync(fn, *args, **kwargs)
+
+async def run_in_session(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run ``fn(session, ...)`` in a fresh session outside any request"""
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+
+    def call():
+        db = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+    return await run_in_threadpool(call)
+
+async def get_db_runner():
+    if DATABASE_ASYNC:
+        async with AsyncSessionLocal() as session:
+            yield AsyncDBRunner(session)
+    else:
+        db = SessionLocal()
+        try:
+            yield ThreadedDBRunner(db)
+        finally:
+            await run_in_threadpool(db.close)
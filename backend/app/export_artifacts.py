@@ -0,0 +1,212 @@
+"""
+Whitelist export files built in the background and reused until the whitelist changes
+"""
+import asyncio
+import fcntl
+import gzip
+import logging
+import os
+import re
+import tempfile
+import zlib
+from dataclasses import dataclass
+from itertools import tee
+from typing import Callable, Iterable, Iterator, List, Optional
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from .collections_cache import etag_matches
+from .db_models import DATABASE_URL, SessionLocal, WhitelistEntryDB, get_cache_version
+from .exports import (
+    GZIP_LEVEL, accepts_gzip, export_response, iter_entry_batches,
+    render_addresses, render_csv, render_json, render_txt
+)
+from .whitelist_writes import WHITELIST_VERSION_KEY
+
+logger = logging.getLogger(__name__)
+
+# Shared by the workers on one host; defaults to a per-database temp directory.
+EXPORT_DIR = os.getenv("EXPORT_DIR") or os.path.join(
+    tempfile.gettempdir(), f"xrpl-whitelist-exports-{zlib.crc32(DATABASE_URL.encode('utf-8')):08x}"
+)
+EXPORT_REFRESH_INTERVAL = float(os.getenv("EXPORT_REFRESH_INTERVAL", "30"))
+
+_ARTIFACT_NAME = re.compile(r"whitelist-(\d+)\.")
+BUILD_LOCK_NAME = ".build.lock"
+
+@dataclass(frozen=True)
+class ExportFormat:
+    name: str
+    media_type: str
+    filename: str
+    render: Callable[[Iterable[List[WhitelistEntryDB]]], Iterator[str]]
+
+EXPORT_FORMATS = {f.name: f for f in (
+    ExportFormat("json", "application/json", "whitelist.json", render_json),
+    ExportFormat("txt", "text/plain", "whitelist.txt", render_txt),
+    ExportFormat("addresses", "text/plain", "wallet_addresses.txt", render_addresses),
+    ExportFormat("csv", "text/csv", "whitelist.csv", render_csv),
+)}
+
+def artifact_path(version: int, fmt: str, compressed: bool = False) -> str:
+    return os.path.join(EXPORT_DIR, f"whitelist-{version}.{fmt}" + (".gz" if compressed else ""))
+
+def _whitelist_version() -> int:
+    db = SessionLocal()
+    try:
+        return get_cache_version(db, WHITELIST_VERSION_KEY)
+    finally:
+        db.close()
+
+def _artifacts_ready(version: int) -> bool:
+    return all(
+        os.path.exists(artifact_path(version, fmt, compressed))
+        for fmt in EXPORT_FORMATS for compressed in (False, True)
+    )
+
+def _prune(version: int):
+    """Delete artifacts older than the previous version, which may still be downloading"""
+    versions = set()
+    for name in os.listdir(EXPORT_DIR):
+        match = _ARTIFACT_NAME.match(name)
+        if match:
+            versions.add(int(match.group(1)))
+    keep = {version, max((v for v in versions if v < version), default=version)}
+    for name in os.listdir(EXPORT_DIR):
+        match = _ARTIFACT_NAME.match(name)
+        if match and int(match.group(1)) not in keep:
+            try:
+                os.remove(os.path.join(EXPORT_DIR, name))
+            except FileNotFoundError:
+                pass
+
+def build_artifacts(version: int):
+    """Render every format, plain and gzipped, from a single table scan"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    batches = iter_entry_batches()
+    outputs = []
+    try:
+        for fmt, stream in zip(EXPORT_FORMATS.values(), tee(batches, len(EXPORT_FORMATS))):
+            plain = tempfile.NamedTemporaryFile(dir=EXPORT_DIR, prefix=".tmp-", delete=False)
+            packed = tempfile.NamedTemporaryFile(dir=EXPORT_DIR, prefix=".tmp-", delete=False)
+            # mtime=0 keeps the gzip bytes identical between rebuilds.
+            compressor = gzip.GzipFile(fileobj=packed, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+            outputs.append((fmt, fmt.render(stream), plain, packed, compressor))
+
+        # Advance the renderers in step so tee only buffers a batch or two.
+        pending = list(outputs)
+        while pending:
+            for output in list(pending):
+                chunk = next(output[1], None)
+                if chunk is None:
+                    pending.remove(output)
+                    continue
+                data = chunk.encode("utf-8")
+                output[2].write(data)
+                output[4].write(data)
+
+        for fmt, _, plain, packed, compressor in outputs:
+            compressor.close()
+            plain.close()
+            packed.close()
+            os.replace(plain.name, artifact_path(version, fmt.name))
+            os.replace(packed.name, artifact_path(version, fmt.name, compressed=True))
+    finally:
+        batches.close()
+        for _, _, plain, packed, compressor in outputs:
+            for handle in (compressor, plain, packed):
+                handle.close()
+            for path in (plain.name, packed.name):
+                if os.path.exists(path):
+                    os.remove(path)
+    _prune(version)
+
+def build_locked(version: int) -> bool:
+    """Build ``version`` unless it is built or another process is building; True if built here.
+
+    The lock is an flock on a file in EXPORT_DIR, so it covers every worker
+    on the host and is released if its holder dies mid-build.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    with open(os.path.join(EXPORT_DIR, BUILD_LOCK_NAME), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            if _artifacts_ready(version):
+                return False
+            build_artifacts(version)
+            return True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+class ExportArtifacts:
+    """Keeps export files for the current whitelist version on disk.
+
+    Every whitelist write bumps the ``whitelist`` version in the same
+    transaction. Only the background loop builds files, one process at a
+    time; a download arriving before the current version's files exist is
+    streamed from the table instead of waiting for the build.
+    """
+
+    def __init__(self, interval: float = EXPORT_REFRESH_INTERVAL):
+        self.interval = interval
+        self.builds = 0
+        self.streamed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self):
+        """Build the current version's files if no process has yet"""
+        version = await run_in_threadpool(_whitelist_version)
+        if await run_in_threadpool(build_locked, version):
+            self.builds += 1
+
+    async def response(self, request: Request, fmt: str) -> Response:
+        export = EXPORT_FORMATS[fmt]
+        version = await run_in_threadpool(_whitelist_version)
+        # Byte ranges always refer to the uncompressed file.
+        compressed = accepts_gzip(request) and "range" not in request.headers
+        path = artifact_path(version, export.name, compressed)
+        try:
+            stat_result = await run_in_threadpool(os.stat, path)
+        except FileNotFoundError:
+            self.streamed += 1
+            return export_response(
+                request, export.render(iter_entry_batches()), export.media_type, export.filename
+            )
+        etag = f'"{version:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}{"-gz" if compressed else ""}"'
+        headers = {
+            "Content-Disposition": f"attachment; filename={export.filename}",
+            "Vary": "Accept-Encoding",
+            "ETag": etag,
+            "Cache-Control": "no-cache"
+        }
+        if compressed:
+            headers["Content-Encoding"] = "gzip"
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type=export.media_type, headers=headers, stat_result=stat_result)
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Export build failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+export_artifacts = ExportArtifacts()
@@ -0,0 +1,135 @@
+"""
+Whitelist export renderers for the admin download endpoints
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from itertools import islice
+from typing import Iterable, Iterator, List
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from .db_models import SessionLocal, WhitelistEntryDB
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+GZIP_LEVEL = 6
+
+def iter_entry_batches(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[WhitelistEntryDB]]:
+    """Stream whitelist entries, newest first, ``batch_size`` rows at a time"""
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(WhitelistEntryDB)
+            .order_by(WhitelistEntryDB.created_at.desc())
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
+        )
+        rows = iter(query)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+    finally:
+        db.close()
+
+def _entry_dict(e: WhitelistEntryDB) -> dict:
+    return {
+        'id': e.id,
+        'full_name': e.full_name,
+        'email': e.email,
+        'wallet_address': e.wallet_address,
+        'street_address': e.street_address,
+        'city': e.city,
+        'state_province': e.state_province,
+        'zip_postal': e.zip_postal,
+        'country': e.country,
+        'phone_number': e.phone_number,
+        'created_at': e.created_at.isoformat()
+    }
+
+def render_json(batches: Iterable[List[WhitelistEntryDB]]) -> Iterator[str]:
+    """Byte-for-byte the output of ``json.dumps(entries, indent=2)``, chunked"""
+    first = True
+    for batch in batches:
+        parts = []
+        for e in batch:
+            item = "  " + json.dumps(_entry_dict(e), indent=2).replace("\n", "\n  ")
+            parts.append(("[\n" if first else ",\n") + item)
+            first = False
+        yield "".join(parts)
+    yield "[]" if first else "\n]"
+
+def render_txt(batches: Iterable[List[WhitelistEntryDB]]) -> Iterator[str]:
+    yield "XRPL NFT Whitelist Entries\n" + "=" * 80 + "\n\n"
+    i = 0
+    for batch in batches:
+        lines = []
+        for entry in batch:
+            i += 1
+            lines.append(f"Entry #{i}\n")
+            lines.append(f"Name: {entry.full_name}\n")
+            lines.append(f"Email: {entry.email}\n")
+            lines.append(f"Wallet: {entry.wallet_address}\n")
+            lines.append(f"Address: {entry.street_address}, {entry.city}, {entry.state_province} {entry.zip_postal}, {entry.country}\n")
+            if entry.phone_number:
+                lines.append(f"Phone: {entry.phone_number}\n")
+            lines.append(f"Registered: {entry.created_at.isoformat()}\n")
+            lines.append("-" * 80 + "\n\n")
+        yield "".join(lines)
+
+def render_addresses(batches: Iterable[List[WhitelistEntryDB]]) -> Iterator[str]:
+    first = True
+    for batch in batches:
+        chunk = "\n".join(entry.wallet_address for entry in batch)
+        yield chunk if first else "\n" + chunk
+        first = False
+
+CSV_FIELDS = (
+    "id", "full_name", "email", "wallet_address", "street_address", "city",
+    "state_province", "zip_postal", "country", "phone_number", "created_at",
+)
+
+def render_csv(batches: Iterable[List[WhitelistEntryDB]]) -> Iterator[str]:
+    """One header line, then one row per entry; re-importable through the CSV import"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_FIELDS)
+    for batch in batches:
+        for e in batch:
+            writer.writerow((
+                e.id, e.full_name, e.email, e.wallet_address, e.street_address, e.city,
+                e.state_province, e.zip_postal, e.country, e.phone_number or "", e.created_at.isoformat()
+            ))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def export_response(request: Request, chunks: Iterator[str], media_type: str, filename: str) -> StreamingResponse:
+    """Wrap a chunk generator as a download, gzip-encoded when the client accepts it"""
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Vary": "Accept-Encoding"
+    }
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(gzip_stream(chunks), media_type=media_type, headers=headers)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
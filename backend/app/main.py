@@ -1,24 +1,57 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+# Imported first so the startup timer also covers the imports below.
+from app.startup import STARTUP_TIMING, startup_timer
+from fastapi import FastAPI, Depends, HTTPException, Path, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from datetime import timedelta
-from typing import List
+from typing import Any, Dict, List, Optional
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 import json
+import time
 import uuid
 import os
 
 from app.models import (
     WhitelistEntry, WhitelistCreate, NFTCollection, NFTCollectionCreate,
-    Token, NFTVerifyRequest
+    Token, NFTVerifyRequest, NFTVerifyBatchRequest, SignatureBatchRequest
 )
-from app.db_models import init_db, get_db, WhitelistEntryDB, NFTCollectionDB, AdminWalletDB, AdminRole
-from app.auth import create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.xrpl_service import xrpl_service
+from app.db_models import (
+    init_db, init_db_async, close_db_async, get_db_runner, DBRunner, DATABASE_ASYNC, DB_INIT,
+    WhitelistEntryDB, NFTCollectionDB, AdminWalletDB, AdminRole
+)
+from app.admin_roles import admin_roles
+from app.auth import (
+    create_access_token, verify_token, verify_token_claims, token_cache, ACCESS_TOKEN_EXPIRE_MINUTES
+)
+from app.xrpl_service import XRPLRequestError, XRPLServiceError, XRPLUnavailableError, xrpl_service
+from app.whitelist_query import (
+    filter_entries, after_cursor, encode_cursor, count_entries, invalidate_counts, count_cache,
+    ENTRY_COLUMNS, ENTRY_FIELDS, WHITELIST_PAGE_DEFAULT, WHITELIST_PAGE_MAX
+)
+from app.whitelist_writes import (
+    build_entry_row, entry_from_row, insert_entry, record_whitelist_change, whitelist_writer, WHITELIST_WRITE_BATCHING
+)
+from app.whitelist_import import import_request_body
+from app.export_artifacts import export_artifacts
+from app.change_feed import decode_change_cursor, encode_change_cursor, log_clear, read_changes, CHANGE_FEED_PAGE_DEFAULT, CHANGE_FEED_PAGE_MAX
+from app.challenge_store import challenge_purger
+from app.fast_json import dumps, json_response, rows_to_json
+from app.wallet_index import record_clear, wallet_exists, wallet_index
+from app.whitelist_stats import read_stats, reset_stats, stats_reconciler, STATS_HOURS_DEFAULT, STATS_HOURS_MAX
+from app.nft_index import nft_indexer, NFT_INDEXER_ENABLED
+from app.metrics import (
+    METRICS_ENABLED, METRICS_TOKEN, MetricsMiddleware, cache_collector, registry, scrape_authorized, xrpl_pool_collector
+)
+from app.collections_cache import collections_cache, etag_matches
+from app.nft_verification import (
+    verify_wallet, cache_stats, stream_batch_verification, verification_cache,
+    iter_whitelist_addresses, count_whitelist_addresses, iter_addresses
+)
+from app.signing_pool import signing_pool
 from app.wallet_auth import (
-    create_challenge, verify_challenge, is_super_admin,
+    create_challenge, verify_challenge,
     add_admin_wallet, remove_admin_wallet
 )
 from pydantic import BaseModel
@@ -47,7 +80,35 @@ app = FastAPI(title="XRPL NFT Whitelist API")
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    if not startup_timer.phases:
+        # Served normally rather than through `python -m app.startup`.
+        startup_timer.record("imports", time.perf_counter() - startup_timer.started)
+    if DB_INIT != "skip":
+        with startup_timer.phase("init_db"):
+            if DATABASE_ASYNC:
+                await init_db_async()
+            else:
+                init_db()
+    challenge_purger.start()
+    wallet_index.start()
+    export_artifacts.start()
+    stats_reconciler.start()
+    if NFT_INDEXER_ENABLED:
+        nft_indexer.start()
+    if STARTUP_TIMING:
+        startup_timer.print_report()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await challenge_purger.aclose()
+    await nft_indexer.aclose()
+    await wallet_index.aclose()
+    await export_artifacts.aclose()
+    await stats_reconciler.aclose()
+    await whitelist_writer.aclose()
+    await xrpl_service.aclose()
+    await close_db_async()
+    signing_pool.shutdown()
 
 # Disable CORS. Do not remove this for full-stack development.
 app.add_middleware(
@@ -56,79 +117,124 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Cache", "X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+
+registry.add_collector(cache_collector({
+    "nft_verification": verification_cache,
+    "tokens": token_cache,
+    "whitelist_count": count_cache,
+    "wallet_index": wallet_index,
+}))
+registry.add_collector(xrpl_pool_collector(xrpl_service.client))
 
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text-format metrics for this worker, for scrapers holding METRICS_TOKEN"""
+    if not METRICS_ENABLED or not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not scrape_authorized(request.headers.get("authorization")):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/api/whitelist", response_model=WhitelistEntry)
-async def create_whitelist_entry(entry: WhitelistCreate, db: Session = Depends(get_db)):
-    try:
-        entry_id = str(uuid.uuid4())
-        db_entry = WhitelistEntryDB(
-            id=entry_id,
-            full_name=entry.full_name,
-            email=entry.email,
-            wallet_address=entry.wallet_address,
-            street_address=entry.street_address,
-            city=entry.city,
-            state_province=entry.state_province,
-            zip_postal=entry.zip_postal,
-            country=entry.country,
-            phone_number=entry.phone_number
-        )
-        db.add(db_entry)
-        db.commit()
-        db.refresh(db_entry)
-        
-        return WhitelistEntry(
-            id=db_entry.id,
-            full_name=db_entry.full_name,
-            email=db_entry.email,
-            wallet_address=db_entry.wallet_address,
-            street_address=db_entry.street_address,
-            city=db_entry.city,
-            state_province=db_entry.state_province,
-            zip_postal=db_entry.zip_postal,
-            country=db_entry.country,
-            phone_number=db_entry.phone_number,
-            created_at=db_entry.created_at
-        )
-    except IntegrityError:
-        db.rollback()
+async def create_whitelist_entry(entry: WhitelistCreate, db: DBRunner = Depends(get_db_runner)):
+    # The index may predate a clear made by another worker, so a hit is
+    # confirmed in the database; misses go straight to the insert.
+    if wallet_index.known(entry.wallet_address) and await db.run(wallet_exists, entry.wallet_address):
         raise HTTPException(status_code=409, detail="Wallet address already registered")
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    row = build_entry_row(entry)
+    try:
+        if WHITELIST_WRITE_BATCHING:
+            await whitelist_writer.submit(row)
+        else:
+            await db.run(insert_entry, row)
+    except HTTPException as e:
+        # 409 is only raised once the wallet has been seen in the database.
+        if e.status_code == 409:
+            wallet_index.add([entry.wallet_address])
+        raise
+    wallet_index.add([entry.wallet_address])
+    return entry_from_row(row)
+
+@app.get("/api/whitelist/{wallet_address}/status")
+async def get_whitelist_status(
+    wallet_address: str = Path(..., pattern=r'^r[a-zA-Z0-9]{24,34}$'),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Whether a wallet is whitelisted, usually answered from the in-process index"""
+    return {"wallet_address": wallet_address, "whitelisted": await wallet_index.contains(db, wallet_address)}
 
 @app.get("/api/whitelist", response_model=List[WhitelistEntry])
-async def get_whitelist_entries(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    entries = db.query(WhitelistEntryDB).order_by(WhitelistEntryDB.created_at.desc()).all()
-    return [WhitelistEntry(
-        id=e.id,
-        full_name=e.full_name,
-        email=e.email,
-        wallet_address=e.wallet_address,
-        street_address=e.street_address,
-        city=e.city,
-        state_province=e.state_province,
-        zip_postal=e.zip_postal,
-        country=e.country,
-        phone_number=e.phone_number,
-        created_at=e.created_at
-    ) for e in entries]
+async def get_whitelist_entries(
+    request: Request,
+    limit: int = Query(WHITELIST_PAGE_DEFAULT, ge=1, le=WHITELIST_PAGE_MAX),
+    cursor: Optional[str] = None,
+    country: Optional[str] = None,
+    email_domain: Optional[str] = None,
+    wallet_prefix: Optional[str] = None,
+    username: str = Depends(verify_token),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """List entries newest first, one page of ``limit`` at a time.
+
+    When more entries follow a page, the cursor for the next one is sent
+    in the X-Next-Cursor header. Full copies come from the download
+    endpoints or the change feed.
+    """
+    def fetch(db: Session) -> List[Row]:
+        query = filter_entries(db.query(*ENTRY_COLUMNS), country, email_domain, wallet_prefix)
+        if cursor:
+            query = after_cursor(query, cursor)
+        query = query.order_by(WhitelistEntryDB.created_at.desc(), WhitelistEntryDB.id.desc())
+        return query.limit(limit + 1).all()
+
+    try:
+        entries = await db.run(fetch)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    headers = {}
+    if len(entries) > limit:
+        entries = entries[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(entries[-1])
+
+    # Rows are encoded column by column, skipping ORM and Pydantic objects.
+    return json_response(request, rows_to_json(ENTRY_FIELDS, entries), headers)
+
+@app.get("/api/whitelist/count")
+async def get_whitelist_count(
+    country: Optional[str] = None,
+    email_domain: Optional[str] = None,
+    wallet_prefix: Optional[str] = None,
+    username: str = Depends(verify_token),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Number of entries matching the filters.
+
+    Totals and per-country counts come from the maintained stats; other
+    filter sets are counted and cached for WHITELIST_COUNT_CACHE_TTL.
+    """
+    return {"count": await count_entries(db, country, email_domain, wallet_prefix)}
 
 @app.post("/api/auth/challenge")
-async def request_challenge(request: ChallengeRequest, db: Session = Depends(get_db)):
+async def request_challenge(request: ChallengeRequest, db: DBRunner = Depends(get_db_runner)):
     """Request an authentication challenge for wallet-based login"""
-    challenge = create_challenge(db, request.wallet_address)
+    challenge = await db.run(create_challenge, request.wallet_address)
     return challenge
 
 @app.post("/api/auth/verify", response_model=Token)
-async def verify_wallet_signature(request: VerifyRequest, db: Session = Depends(get_db)):
+async def verify_wallet_signature(request: VerifyRequest, db: DBRunner = Depends(get_db_runner)):
     """Verify wallet signature and issue JWT token"""
-    admin_wallet = verify_challenge(
+    # Read before the admin lookup, so a concurrent revocation always
+    # leaves the token with an outdated version.
+    admin_version = await admin_roles.fresh_version(db)
+    admin_wallet = await verify_challenge(
         db,
         request.challenge_id,
         request.wallet_address,
@@ -140,34 +246,49 @@ async def verify_wallet_signature(request: VerifyRequest, db: Session = Depends(
     access_token = create_access_token(
         data={
             "sub": admin_wallet.wallet_address,
-            "role": admin_wallet.role.value
+            "role": admin_wallet.role.value,
+            "av": admin_version
         },
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.post("/api/admin/auth/verify/batch")
+async def verify_signatures_batch(request: SignatureBatchRequest, username: str = Depends(verify_token)):
+    """Check many signed messages on the signing pool (for load testing)"""
+    results = await signing_pool.check_batch([
+        (item.message, item.signature, item.public_key, item.wallet_address)
+        for item in request.items
+    ])
+    return {
+        "total": len(results),
+        "valid": sum(1 for r in results if r["valid"]),
+        "results": results,
+        "pool": signing_pool.stats()
+    }
+
+ADMIN_WALLET_FIELDS = ("id", "wallet_address", "role", "added_by", "created_at")
+
+def _list_admin_wallets(db: Session) -> List[Row]:
+    columns = [getattr(AdminWalletDB, field) for field in ADMIN_WALLET_FIELDS]
+    return db.query(*columns).order_by(AdminWalletDB.created_at.desc()).all()
+
 @app.get("/api/admin/wallets", response_model=List[AdminWalletResponse])
-async def get_admin_wallets(username: str = Depends(verify_token), db: Session = Depends(get_db)):
+async def get_admin_wallets(request: Request, claims: Dict[str, Any] = Depends(verify_token_claims), db: DBRunner = Depends(get_db_runner)):
     """Get all admin wallets (super admin only)"""
-    if not is_super_admin(db, username):
+    if claims["role"] != AdminRole.super_admin.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only super admins can view admin wallets"
         )
     
-    admins = db.query(AdminWalletDB).order_by(AdminWalletDB.created_at.desc()).all()
-    return [AdminWalletResponse(
-        id=a.id,
-        wallet_address=a.wallet_address,
-        role=a.role.value,
-        added_by=a.added_by,
-        created_at=a.created_at.isoformat()
-    ) for a in admins]
+    admins = await db.run(_list_admin_wallets)
+    return json_response(request, rows_to_json(ADMIN_WALLET_FIELDS, admins))
 
 @app.post("/api/admin/wallets", response_model=AdminWalletResponse)
-async def add_admin(request: AddAdminRequest, username: str = Depends(verify_token), db: Session = Depends(get_db)):
+async def add_admin(request: AddAdminRequest, claims: Dict[str, Any] = Depends(verify_token_claims), db: DBRunner = Depends(get_db_runner)):
     """Add a new admin wallet (super admin only)"""
-    if not is_super_admin(db, username):
+    if claims["role"] != AdminRole.super_admin.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only super admins can add admin wallets"
@@ -181,7 +302,7 @@ async def add_admin(request: AddAdminRequest, username: str = Depends(verify_tok
             detail=f"Invalid role. Must be one of: {[r.value for r in AdminRole]}"
         )
     
-    admin = add_admin_wallet(db, request.wallet_address, role, username)
+    admin = await db.run(add_admin_wallet, request.wallet_address, role, claims["sub"])
     return AdminWalletResponse(
         id=admin.id,
         wallet_address=admin.wallet_address,
@@ -191,79 +312,87 @@ async def add_admin(request: AddAdminRequest, username: str = Depends(verify_tok
     )
 
 @app.delete("/api/admin/wallets/{wallet_address}")
-async def remove_admin(wallet_address: str, username: str = Depends(verify_token), db: Session = Depends(get_db)):
+async def remove_admin(wallet_address: str, claims: Dict[str, Any] = Depends(verify_token_claims), db: DBRunner = Depends(get_db_runner)):
     """Remove an admin wallet (super admin only)"""
-    if not is_super_admin(db, username):
+    if claims["role"] != AdminRole.super_admin.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only super admins can remove admin wallets"
         )
     
-    remove_admin_wallet(db, wallet_address, username)
+    await db.run(remove_admin_wallet, wallet_address, claims["sub"])
     return {"message": "Admin wallet removed successfully"}
 
+@app.post("/api/admin/whitelist/import")
+async def import_whitelist(request: Request, format: Optional[str] = None, username: str = Depends(verify_token)):
+    """Bulk import entries from a streamed CSV or NDJSON body"""
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format must be csv or ndjson"
+        )
+    report = await import_request_body(request, fmt)
+    invalidate_counts()
+    if report["inserted"]:
+        # Until the next refresh reloads it, new wallets are found through the database.
+        wallet_index.mark_stale()
+    if "error" in report:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=report)
+    return report
+
 @app.get("/api/admin/download/json")
-async def download_whitelist_json(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    entries = db.query(WhitelistEntryDB).order_by(WhitelistEntryDB.created_at.desc()).all()
-    entries_dict = [{
-        'id': e.id,
-        'full_name': e.full_name,
-        'email': e.email,
-        'wallet_address': e.wallet_address,
-        'street_address': e.street_address,
-        'city': e.city,
-        'state_province': e.state_province,
-        'zip_postal': e.zip_postal,
-        'country': e.country,
-        'phone_number': e.phone_number,
-        'created_at': e.created_at.isoformat()
-    } for e in entries]
-    
-    json_content = json.dumps(entries_dict, indent=2)
-    return PlainTextResponse(
-        content=json_content,
-        media_type="application/json",
-        headers={"Content-Disposition": "attachment; filename=whitelist.json"}
-    )
+async def download_whitelist_json(request: Request, username: str = Depends(verify_token)):
+    return await export_artifacts.response(request, "json")
 
 @app.get("/api/admin/download/txt")
-async def download_whitelist_txt(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    entries = db.query(WhitelistEntryDB).order_by(WhitelistEntryDB.created_at.desc()).all()
-    
-    lines = ["XRPL NFT Whitelist Entries\n", "=" * 80 + "\n\n"]
-    
-    for i, entry in enumerate(entries, 1):
-        lines.append(f"Entry #{i}\n")
-        lines.append(f"Name: {entry.full_name}\n")
-        lines.append(f"Email: {entry.email}\n")
-        lines.append(f"Wallet: {entry.wallet_address}\n")
-        lines.append(f"Address: {entry.street_address}, {entry.city}, {entry.state_province} {entry.zip_postal}, {entry.country}\n")
-        if entry.phone_number:
-            lines.append(f"Phone: {entry.phone_number}\n")
-        lines.append(f"Registered: {entry.created_at.isoformat()}\n")
-        lines.append("-" * 80 + "\n\n")
-    
-    txt_content = "".join(lines)
-    return PlainTextResponse(
-        content=txt_content,
-        media_type="text/plain",
-        headers={"Content-Disposition": "attachment; filename=whitelist.txt"}
-    )
+async def download_whitelist_txt(request: Request, username: str = Depends(verify_token)):
+    return await export_artifacts.response(request, "txt")
 
 @app.get("/api/admin/download/addresses")
-async def download_wallet_addresses(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    entries = db.query(WhitelistEntryDB).order_by(WhitelistEntryDB.created_at.desc()).all()
-    addresses = [entry.wallet_address for entry in entries]
-    
-    txt_content = "\n".join(addresses)
-    return PlainTextResponse(
-        content=txt_content,
-        media_type="text/plain",
-        headers={"Content-Disposition": "attachment; filename=wallet_addresses.txt"}
-    )
+async def download_wallet_addresses(request: Request, username: str = Depends(verify_token)):
+    return await export_artifacts.response(request, "addresses")
 
-@app.post("/api/collections", response_model=NFTCollection)
-async def create_nft_collection(collection: NFTCollectionCreate, username: str = Depends(verify_token), db: Session = Depends(get_db)):
+@app.get("/api/admin/download/csv")
+async def download_whitelist_csv(request: Request, username: str = Depends(verify_token)):
+    return await export_artifacts.response(request, "csv")
+
+@app.get("/api/admin/stats")
+async def get_admin_stats(
+    hours: int = Query(STATS_HOURS_DEFAULT, ge=1, le=STATS_HOURS_MAX),
+    username: str = Depends(verify_token),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Dashboard aggregates read from the maintained stats table, whatever the whitelist size"""
+    def fetch(db: Session) -> Dict[str, Any]:
+        stats = read_stats(db, hours)
+        stats["collections"] = len(collections_cache.get(db).collections)
+        return stats
+
+    return await db.run(fetch)
+
+@app.get("/api/admin/whitelist/changes")
+async def get_whitelist_changes(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(CHANGE_FEED_PAGE_DEFAULT, ge=1, le=CHANGE_FEED_PAGE_MAX),
+    username: str = Depends(verify_token),
+    db: DBRunner = Depends(get_db_runner)
+):
+    """Entries added and removed since ``cursor``, oldest change first.
+
+    Without a cursor the feed starts from the beginning. Pass the returned
+    cursor back to continue; it is returned even when nothing changed.
+    """
+    try:
+        after = decode_change_cursor(cursor) if cursor else 0
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    changes, last_seq, has_more = await db.run(read_changes, after, limit)
+    body = dumps({"changes": changes, "cursor": encode_change_cursor(last_seq), "has_more": has_more})
+    return json_response(request, body)
+
+def _insert_nft_collection(db: Session, collection: NFTCollectionCreate) -> NFTCollection:
     try:
         collection_id = str(uuid.uuid4())
         db_collection = NFTCollectionDB(
@@ -273,6 +402,7 @@ async def create_nft_collection(collection: NFTCollectionCreate, username: str =
             taxon=collection.taxon
         )
         db.add(db_collection)
+        collections_cache.invalidate(db)
         db.commit()
         db.refresh(db_collection)
         
@@ -287,63 +417,120 @@ async def create_nft_collection(collection: NFTCollectionCreate, username: str =
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/collections", response_model=NFTCollection)
+async def create_nft_collection(collection: NFTCollectionCreate, username: str = Depends(verify_token), db: DBRunner = Depends(get_db_runner)):
+    return await db.run(_insert_nft_collection, collection)
+
 @app.get("/api/collections", response_model=List[NFTCollection])
-async def get_nft_collections(db: Session = Depends(get_db)):
-    collections = db.query(NFTCollectionDB).order_by(NFTCollectionDB.created_at.desc()).all()
-    return [NFTCollection(
-        id=c.id,
-        name=c.name,
-        issuer=c.issuer,
-        taxon=c.taxon,
-        created_at=c.created_at
-    ) for c in collections]
+async def get_nft_collections(request: Request, db: DBRunner = Depends(get_db_runner)):
+    snapshot = await db.run(collections_cache.get)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
-@app.delete("/api/collections/{collection_id}")
-async def delete_nft_collection(collection_id: str, username: str = Depends(verify_token), db: Session = Depends(get_db)):
+def _delete_nft_collection(db: Session, collection_id: str):
     collection = db.query(NFTCollectionDB).filter(NFTCollectionDB.id == collection_id).first()
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     db.delete(collection)
+    collections_cache.invalidate(db)
     db.commit()
+
+@app.delete("/api/collections/{collection_id}")
+async def delete_nft_collection(collection_id: str, username: str = Depends(verify_token), db: DBRunner = Depends(get_db_runner)):
+    await db.run(_delete_nft_collection, collection_id)
     return {"message": "Collection deleted successfully"}
 
-@app.delete("/api/admin/whitelist")
-async def clear_whitelist(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    """Clear all whitelist entries"""
+def _clear_whitelist(db: Session) -> int:
     count = db.query(WhitelistEntryDB).count()
+    record_clear(db)
+    record_whitelist_change(db)
+    log_clear(db)
+    reset_stats(db)
     db.query(WhitelistEntryDB).delete()
     db.commit()
+    return count
+
+@app.delete("/api/admin/whitelist")
+async def clear_whitelist(username: str = Depends(verify_token), db: DBRunner = Depends(get_db_runner)):
+    """Clear all whitelist entries"""
+    count = await db.run(_clear_whitelist)
+    wallet_index.clear()
+    invalidate_counts()
     return {"deleted": count, "message": f"Cleared {count} whitelist entries"}
 
-@app.delete("/api/admin/collections")
-async def clear_collections(username: str = Depends(verify_token), db: Session = Depends(get_db)):
-    """Clear all NFT collections"""
+def _clear_collections(db: Session) -> int:
     count = db.query(NFTCollectionDB).count()
     db.query(NFTCollectionDB).delete()
+    collections_cache.invalidate(db)
     db.commit()
+    return count
+
+@app.delete("/api/admin/collections")
+async def clear_collections(username: str = Depends(verify_token), db: DBRunner = Depends(get_db_runner)):
+    """Clear all NFT collections"""
+    count = await db.run(_clear_collections)
     return {"deleted": count, "message": f"Cleared {count} NFT collections"}
 
 @app.post("/api/nfts/verify")
-async def verify_nft_ownership(request: NFTVerifyRequest, db: Session = Depends(get_db)):
+async def verify_nft_ownership(request: NFTVerifyRequest, response: Response, refresh: bool = False, db: DBRunner = Depends(get_db_runner)):
     try:
-        collections = db.query(NFTCollectionDB).all()
-        collections_dict = [
-            {
-                "name": col.name,
-                "issuer": col.issuer,
-                "taxon": col.taxon
-            }
-            for col in collections
-        ]
-        
-        result = await xrpl_service.verify_nft_ownership(
+        result, cache_hit = await verify_wallet(
             request.wallet_address,
-            collections_dict
+            await db.run(collections_cache.get),
+            refresh=refresh
         )
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         return result
+    except XRPLUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"XRPL unavailable: {str(e)}",
+            headers={"Retry-After": str(xrpl_service.client.retry_after())}
+        )
+    except XRPLRequestError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except XRPLServiceError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/nfts/verify/batch")
+async def verify_nft_ownership_batch(request: NFTVerifyBatchRequest, username: str = Depends(verify_token), db: DBRunner = Depends(get_db_runner)):
+    """Verify many wallets at once, streaming NDJSON records as each completes"""
+    if request.all_whitelist:
+        addresses = iter_whitelist_addresses()
+        total = await count_whitelist_addresses()
+    elif request.wallet_addresses:
+        addresses = iter_addresses(request.wallet_addresses)
+        total = len(request.wallet_addresses)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide wallet_addresses or set all_whitelist"
+        )
+
+    records = stream_batch_verification(
+        addresses,
+        await db.run(collections_cache.get),
+        total=total,
+        concurrency=request.concurrency,
+        stop_on_match=request.stop_on_match,
+        refresh=request.refresh
+    )
+
+    async def ndjson():
+        async for record in records:
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/api/admin/cache/stats")
+async def get_cache_stats(username: str = Depends(verify_token)):
+    """Hit/miss counters for the in-process caches"""
+    return {**cache_stats(), "tokens": token_cache.stats(), "xrpl": xrpl_service.client.stats(), "nft_index": nft_indexer.stats(), "wallet_index": wallet_index.stats()}
+
 frontend_dist = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend_dist")
 if os.path.exists(frontend_dist):
     app.mount("/", StaticFiles(directory=frontend_dist, html=True), name="static")
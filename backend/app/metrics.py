@@ -0,0 +1,246 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Each worker keeps its own counters; scrape every worker (or run a single
+one) as with prometheus_client's default, non-multiprocess mode.
+"""
+import hmac
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# /metrics is only served when a scrape token is configured.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines for this metric, header included"""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            state[0][index] += 1
+            state[1][0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total[0]) for labels, (counts, total) in self._values.items()]
+        lines = self.header()
+        bounds = self.buckets + (float("inf"),)
+        names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        """Add a callable building metrics at scrape time (for stats kept elsewhere)"""
+        self._collectors.append(collector)
+
+    def render(self) -> bytes:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+registry = Registry()
+
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ["method"]))
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route", "status"]))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Database statement latency", ["operation"], buckets=DB_BUCKETS))
+db_query_errors = registry.register(Counter(
+    "db_query_errors_total", "Database statements that raised", ["operation"]))
+xrpl_request_duration = registry.register(Histogram(
+    "xrpl_request_duration_seconds", "XRPL JSON-RPC latency", ["node", "method"]))
+xrpl_request_errors = registry.register(Counter(
+    "xrpl_request_errors_total", "Failed XRPL JSON-RPC calls", ["node", "method", "kind"]))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method)
+            # The router stores the matched route in the shared scope.
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - started, method, path, str(status_code))
+
+def _operation(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+def instrument_engine(sync_engine):
+    """Time every statement run through ``sync_engine`` (or an async engine's sync_engine)"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, _operation(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+        db_query_errors.inc(_operation(context.statement or ""))
+
+def scrape_authorized(authorization: Optional[str]) -> bool:
+    """Whether a scrape presents ``Authorization: Bearer <METRICS_TOKEN>``"""
+    if not METRICS_TOKEN or not authorization:
+        return False
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode())
+
+def observe_xrpl(node: str, method: str, started: float, error: Optional[str] = None):
+    xrpl_request_duration.observe(time.perf_counter() - started, node, method)
+    if error is not None:
+        xrpl_request_errors.inc(node, method, error)
+
+def cache_collector(caches: Dict[str, Any]) -> Callable[[], Iterable[_Metric]]:
+    """Collector exposing hits/misses/size of objects with TTLCache-style counters"""
+    def collect() -> Iterable[_Metric]:
+        hits = Counter("cache_hits_total", "Cache lookups answered from the cache", ["cache"])
+        misses = Counter("cache_misses_total", "Cache lookups that missed", ["cache"])
+        ratio = Gauge("cache_hit_ratio", "Hits over lookups since start", ["cache"])
+        size = Gauge("cache_entries", "Entries currently cached", ["cache"])
+        for name, cache in caches.items():
+            hits.inc(name, amount=cache.hits)
+            misses.inc(name, amount=cache.misses)
+            lookups = cache.hits + cache.misses
+            ratio.set(name, value=cache.hits / lookups if lookups else 0.0)
+            size.set(name, value=len(cache))
+        return [hits, misses, ratio, size]
+    return collect
+
+def xrpl_pool_collector(pool: Any) -> Callable[[], Iterable[_Metric]]:
+    """Collector exposing per-node latency and breaker state of an XRPLNodePool"""
+    def collect() -> Iterable[_Metric]:
+        up = Gauge("xrpl_node_available", "1 while the node's circuit breaker is closed", ["node"])
+        latency = Gauge("xrpl_node_latency_seconds", "Moving average of successful call latency", ["node"])
+        hedges = Counter("xrpl_hedged_requests_total", "Calls duplicated on a second node after the hedge delay")
+        for node in pool.stats()["nodes"]:
+            up.set(node["node"], value=1 if node["available"] else 0)
+            if node["latency_ms"] is not None:
+                latency.set(node["node"], value=node["latency_ms"] / 1000)
+        hedges.inc(amount=pool.hedges)
+        return [up, latency, hedges]
+    return collect
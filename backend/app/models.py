@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Annotated, List, Optional
 from datetime import datetime
 
 class WhitelistEntry(BaseModel):
@@ -48,3 +48,19 @@ class Token(BaseModel):
 
 class NFTVerifyRequest(BaseModel):
     wallet_address: str = Field(..., pattern=r'^r[a-zA-Z0-9]{24,34}$')
+
+class NFTVerifyBatchRequest(BaseModel):
+    wallet_addresses: Optional[List[Annotated[str, Field(pattern=r'^r[a-zA-Z0-9]{24,34}$')]]] = None
+    all_whitelist: bool = False
+    concurrency: int = Field(10, ge=1, le=100)
+    stop_on_match: bool = False
+    refresh: bool = False
+
+class SignatureCheck(BaseModel):
+    message: str
+    signature: str
+    public_key: str
+    wallet_address: Optional[str] = None
+
+class SignatureBatchRequest(BaseModel):
+    items: List[SignatureCheck] = Field(..., max_length=1000)
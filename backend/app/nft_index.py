@@ -0,0 +1,361 @@
+"""
+Local holder index for the tracked NFT collections.
+
+The indexer loads every NFT of the tracked issuers with ``nfts_by_issuer``
+and then follows the ledger one validated ledger at a time, applying the
+``NFTokenPage`` changes in each transaction's metadata. Verification reads
+the ``nft_holdings`` table while the index is fresh and built for the
+current collections, and falls back to live ``account_nfts`` scans
+otherwise.
+
+Run the indexer in a single process: either one worker with
+``NFT_INDEXER_ENABLED=true`` or ``python -m app.nft_index``.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .collections_cache import CollectionsSnapshot, collections_cache
+from .db_models import SessionLocal, NFTHoldingDB, NFTIndexStateDB
+from .xrpl_service import CollectionMatcher, XRPLService, xrpl_service
+
+logger = logging.getLogger(__name__)
+
+NFT_INDEXER_ENABLED = os.getenv("NFT_INDEXER_ENABLED", "false").lower() in ("1", "true", "yes")
+NFT_INDEX_POLL_INTERVAL = float(os.getenv("NFT_INDEX_POLL_INTERVAL", "4"))
+NFT_INDEX_MAX_STALENESS = float(os.getenv("NFT_INDEX_MAX_STALENESS", "30"))
+# Further behind than this and the index is rebuilt instead of replayed.
+NFT_INDEX_MAX_CATCHUP = int(os.getenv("NFT_INDEX_MAX_CATCHUP", "1000"))
+# How often a worker without the indexer looks for an index built elsewhere.
+NFT_INDEX_CHECK_INTERVAL = float(os.getenv("NFT_INDEX_CHECK_INTERVAL", "60"))
+INDEX_STATE_KEY = "holders"
+HOLDINGS_INSERT_BATCH = 1000
+
+Holding = Dict[str, Any]
+
+def _page_owner(ledger_index: str) -> str:
+    # An NFTokenPage ID starts with the owner's 160-bit AccountID.
+    from xrpl.core.addresscodec import encode_classic_address
+    return encode_classic_address(bytes.fromhex(ledger_index[:40]))
+
+def _page_tokens(fields: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    if not fields or "NFTokens" not in fields:
+        return {}
+    return {t["NFToken"]["NFTokenID"]: t["NFToken"].get("URI", "") for t in fields["NFTokens"]}
+
+def nft_changes(meta: Dict[str, Any]) -> Tuple[Dict[str, Tuple[str, str]], Set[str]]:
+    """Ownership changes in one transaction's metadata.
+
+    Returns ``({nft_id: (owner, uri)}, {burned nft_id})``. A token counts as
+    burned when it left a page without landing on another one; tokens moved
+    between pages of the same owner (page splits and merges) show up as
+    re-added with the same owner.
+    """
+    added: Dict[str, Tuple[str, str]] = {}
+    removed: Set[str] = set()
+    for node in meta.get("AffectedNodes", []):
+        kind, entry = next(iter(node.items()))
+        if entry.get("LedgerEntryType") != "NFTokenPage":
+            continue
+        owner = _page_owner(entry["LedgerIndex"])
+        if kind == "CreatedNode":
+            before, after = {}, _page_tokens(entry.get("NewFields"))
+        else:
+            final = entry.get("FinalFields")
+            previous = entry.get("PreviousFields") or {}
+            before = _page_tokens(previous) if "NFTokens" in previous else _page_tokens(final)
+            after = {} if kind == "DeletedNode" else _page_tokens(final)
+        for nft_id, uri in after.items():
+            if before.get(nft_id) != uri:
+                added[nft_id] = (owner, uri)
+        removed.update(nft_id for nft_id in before if nft_id not in after)
+    return added, removed - set(added)
+
+def _holding(nft_id: str, owner: str, uri: str, ledger_index: int) -> Holding:
+    from xrpl.utils import parse_nftoken_id
+    parsed = parse_nftoken_id(nft_id)
+    return {
+        "nft_id": nft_id,
+        "owner": owner,
+        "issuer": parsed["issuer"],
+        "taxon": parsed["taxon"],
+        "uri": uri,
+        "flags": parsed["flags"],
+        "ledger_index": ledger_index,
+    }
+
+def _scopes(matcher: CollectionMatcher) -> List[Tuple[str, Optional[int]]]:
+    """``nfts_by_issuer`` queries covering the tracked collections"""
+    scopes: List[Tuple[str, Optional[int]]] = [(issuer, None) for issuer in matcher.wildcard]
+    scopes += [(issuer, taxon) for issuer, taxon in matcher.exact if issuer not in matcher.wildcard]
+    return scopes
+
+def _get_state(db: Session) -> Optional[NFTIndexStateDB]:
+    return db.get(NFTIndexStateDB, INDEX_STATE_KEY)
+
+def _set_state(db: Session, ledger_index: int, collections_version: int, synced: bool):
+    state = _get_state(db)
+    if state is None:
+        state = NFTIndexStateDB(name=INDEX_STATE_KEY)
+        db.add(state)
+    state.ledger_index = ledger_index
+    state.collections_version = collections_version
+    if synced or state.synced_at is None:
+        state.synced_at = datetime.utcnow()
+
+def is_fresh(state: Optional[NFTIndexStateDB], collections_version: int, now: Optional[datetime] = None) -> bool:
+    if state is None or state.collections_version != collections_version:
+        return False
+    now = now or datetime.utcnow()
+    return now - state.synced_at <= timedelta(seconds=NFT_INDEX_MAX_STALENESS)
+
+def lookup(wallet_address: str, collections: CollectionsSnapshot) -> Optional[Dict[str, Any]]:
+    """Verification result from the index, or None when it is stale"""
+    db = SessionLocal()
+    try:
+        state = _get_state(db)
+        if not is_fresh(state, collections.version):
+            return None
+        rows = (db.query(NFTHoldingDB)
+                .filter(NFTHoldingDB.owner == wallet_address)
+                .order_by(NFTHoldingDB.nft_id)
+                .all())
+        ledger_index = state.ledger_index
+    finally:
+        db.close()
+
+    owned_nfts = []
+    for row in rows:
+        collection = collections.matcher.match(row.issuer, row.taxon)
+        if collection is not None:
+            owned_nfts.append({
+                "nft_id": row.nft_id,
+                "issuer": row.issuer,
+                "taxon": row.taxon,
+                "uri": row.uri or "",
+                "collection_name": collection.get("name", "Unknown"),
+                "flags": row.flags
+            })
+    return {
+        "wallet_address": wallet_address,
+        # Only tracked NFTs are indexed, so the wallet's total is unknown.
+        "total_nfts": None,
+        "tracked_nfts": owned_nfts,
+        "has_tracked_nfts": len(owned_nfts) > 0,
+        "source": "index",
+        "ledger_index": ledger_index
+    }
+
+def _index_exists() -> bool:
+    db = SessionLocal()
+    try:
+        return _get_state(db) is not None
+    finally:
+        db.close()
+
+class IndexReader:
+    """Answers verifications from the index once there is one.
+
+    Until an index state exists, and without the indexer in this process,
+    a worker looks for one at most every ``check_interval`` seconds, so
+    deployments without an index never pay a query per verification.
+    """
+
+    def __init__(self, enabled: bool = NFT_INDEXER_ENABLED, check_interval: float = NFT_INDEX_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._exists = enabled
+        self._checked_at = float("-inf")
+
+    async def verify(self, wallet_address: str, collections: CollectionsSnapshot) -> Optional[Dict[str, Any]]:
+        if not self._exists:
+            now = time.monotonic()
+            if now - self._checked_at < self.check_interval:
+                return None
+            self._checked_at = now
+            self._exists = await run_in_threadpool(_index_exists)
+            if not self._exists:
+                return None
+        return await run_in_threadpool(lookup, wallet_address, collections)
+
+index_reader = IndexReader()
+
+async def verify_from_index(wallet_address: str, collections: CollectionsSnapshot) -> Optional[Dict[str, Any]]:
+    return await index_reader.verify(wallet_address, collections)
+
+def _replace_holdings(holdings: List[Holding], ledger_index: int, collections_version: int):
+    db = SessionLocal()
+    try:
+        db.execute(delete(NFTHoldingDB))
+        for start in range(0, len(holdings), HOLDINGS_INSERT_BATCH):
+            db.execute(insert(NFTHoldingDB), holdings[start:start + HOLDINGS_INSERT_BATCH])
+        _set_state(db, ledger_index, collections_version, synced=True)
+        db.commit()
+    finally:
+        db.close()
+
+def _apply_ledger(
+    changes: Dict[str, Holding],
+    burned: Set[str],
+    ledger_index: int,
+    collections_version: int,
+    synced: bool
+):
+    db = SessionLocal()
+    try:
+        if burned:
+            db.execute(delete(NFTHoldingDB).where(NFTHoldingDB.nft_id.in_(burned)))
+        for holding in changes.values():
+            db.merge(NFTHoldingDB(**holding))
+        _set_state(db, ledger_index, collections_version, synced)
+        db.commit()
+    finally:
+        db.close()
+
+def _mark_synced():
+    db = SessionLocal()
+    try:
+        state = _get_state(db)
+        if state is not None:
+            state.synced_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+def _load_state_and_collections() -> Tuple[Optional[Tuple[int, int]], CollectionsSnapshot]:
+    db = SessionLocal()
+    try:
+        state = _get_state(db)
+        position = (state.ledger_index, state.collections_version) if state is not None else None
+        return position, collections_cache.get(db)
+    finally:
+        db.close()
+
+class NFTIndexer:
+    """Keeps ``nft_holdings`` in step with the ledger in the background"""
+
+    def __init__(self, service: XRPLService = xrpl_service, interval: float = NFT_INDEX_POLL_INTERVAL):
+        self.service = service
+        self.interval = interval
+        self.rebuilds = 0
+        self.ledgers = 0
+        self.changes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync_once()
+            except Exception as e:
+                logger.error(f"NFT index sync failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def sync_once(self):
+        """Rebuild when needed, then replay ledgers up to the validated one"""
+        position, collections = await run_in_threadpool(_load_state_and_collections)
+        validated = await self.service.validated_ledger_index()
+        if (position is None or position[1] != collections.version
+                or validated - position[0] > NFT_INDEX_MAX_CATCHUP):
+            await self.rebuild(collections)
+            return
+
+        ledger_index = position[0]
+        if ledger_index >= validated:
+            await run_in_threadpool(_mark_synced)
+            return
+        while ledger_index < validated:
+            ledger_index += 1
+            await self.apply_ledger(ledger_index, collections, synced=ledger_index == validated)
+
+    async def rebuild(self, collections: CollectionsSnapshot):
+        """Reload every tracked NFT, pinned to a single ledger"""
+        started = time.perf_counter()
+        ledger_index: Any = "validated"
+        holdings: List[Holding] = []
+        scopes = _scopes(collections.matcher)
+        if not scopes:
+            ledger_index = await self.service.validated_ledger_index()
+        for issuer, taxon in scopes:
+            async for ledger_index, page in self.service.iter_issuer_nfts(issuer, taxon, ledger_index):
+                for nft in page:
+                    if nft.get("is_burned") or not nft.get("owner"):
+                        continue
+                    holdings.append({
+                        "nft_id": nft["nft_id"],
+                        "owner": nft["owner"],
+                        "issuer": nft.get("issuer", issuer),
+                        "taxon": nft.get("nft_taxon", taxon),
+                        "uri": nft.get("uri", ""),
+                        "flags": nft.get("flags", 0),
+                        "ledger_index": ledger_index,
+                    })
+        await run_in_threadpool(_replace_holdings, holdings, ledger_index, collections.version)
+        self.rebuilds += 1
+        logger.info(
+            f"NFT index rebuilt: {len(holdings)} NFTs of {len(scopes)} issuer scopes at ledger "
+            f"{ledger_index} in {time.perf_counter() - started:.1f}s"
+        )
+
+    async def apply_ledger(self, ledger_index: int, collections: CollectionsSnapshot, synced: bool = False):
+        changes: Dict[str, Holding] = {}
+        burned: Set[str] = set()
+        metas = []
+        for transaction in await self.service.ledger_transactions(ledger_index):
+            meta = transaction.get("meta") or transaction.get("metaData")
+            if isinstance(meta, dict):
+                metas.append(meta)
+        # Ledgers list transactions by hash; an NFT moving twice in one
+        # ledger must end up with its last owner.
+        metas.sort(key=lambda meta: meta.get("TransactionIndex", 0))
+        for meta in metas:
+            added, removed = nft_changes(meta)
+            for nft_id, (owner, uri) in added.items():
+                holding = _holding(nft_id, owner, uri, ledger_index)
+                if collections.matcher.match(holding["issuer"], holding["taxon"]) is not None:
+                    changes[nft_id] = holding
+                    burned.discard(nft_id)
+            for nft_id in removed:
+                changes.pop(nft_id, None)
+                burned.add(nft_id)
+        await run_in_threadpool(_apply_ledger, changes, burned, ledger_index, collections.version, synced)
+        self.ledgers += 1
+        self.changes += len(changes) + len(burned)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "rebuilds": self.rebuilds,
+            "ledgers_applied": self.ledgers,
+            "holdings_changed": self.changes,
+        }
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+nft_indexer = NFTIndexer()
+
+async def _run_standalone():
+    nft_indexer.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await nft_indexer.aclose()
+        await xrpl_service.aclose()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_standalone())
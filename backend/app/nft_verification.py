@@ -0,0 +1,177 @@
+"""
+Cached, coalesced NFT ownership checks
+"""
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from .cache import TTLCache, SingleFlight
+from .collections_cache import CollectionsSnapshot
+from .db_models import SessionLocal, WhitelistEntryDB
+from .nft_index import verify_from_index
+from .xrpl_service import xrpl_service
+
+logger = logging.getLogger(__name__)
+
+NFT_VERIFY_CACHE_TTL = float(os.getenv("NFT_VERIFY_CACHE_TTL", "60"))
+NFT_VERIFY_CACHE_SIZE = int(os.getenv("NFT_VERIFY_CACHE_SIZE", "10000"))
+WHITELIST_ADDRESS_CHUNK = 1000
+
+verification_cache = TTLCache(maxsize=NFT_VERIFY_CACHE_SIZE, ttl=NFT_VERIFY_CACHE_TTL)
+verification_flights = SingleFlight()
+
+async def verify_wallet(
+    wallet_address: str,
+    collections: CollectionsSnapshot,
+    refresh: bool = False
+) -> Tuple[Dict[str, Any], bool]:
+    """Return ``(result, cache_hit)`` for a wallet against the tracked collections.
+
+    Results are keyed by wallet and collections version, so changing the
+    tracked collections never serves a stale match. Misses are answered from
+    the local holder index while it is fresh; otherwise concurrent misses for
+    the same key share one XRPL scan. ``refresh`` always scans the ledger.
+    """
+    key = (wallet_address, collections.version)
+    if not refresh:
+        cached = verification_cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    async def fetch() -> Dict[str, Any]:
+        result = None if refresh else await verify_from_index(wallet_address, collections)
+        if result is None:
+            result = await xrpl_service.verify_nft_ownership(wallet_address, collections.matcher)
+        verification_cache.set(key, result)
+        return result
+
+    return await verification_flights.do(key, fetch), False
+
+def _whitelist_address_chunk(after: Optional[str], limit: int) -> List[str]:
+    db = SessionLocal()
+    try:
+        query = db.query(WhitelistEntryDB.wallet_address)
+        if after is not None:
+            query = query.filter(WhitelistEntryDB.wallet_address > after)
+        rows = query.order_by(WhitelistEntryDB.wallet_address).limit(limit).all()
+        return [row.wallet_address for row in rows]
+    finally:
+        db.close()
+
+def _whitelist_count() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(WhitelistEntryDB).count()
+    finally:
+        db.close()
+
+async def iter_whitelist_addresses(chunk_size: int = WHITELIST_ADDRESS_CHUNK) -> AsyncIterator[str]:
+    """Walk every whitelisted wallet in keyset-paginated chunks off the event loop"""
+    after = None
+    while True:
+        chunk = await run_in_threadpool(_whitelist_address_chunk, after, chunk_size)
+        for address in chunk:
+            yield address
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1]
+
+async def count_whitelist_addresses() -> int:
+    return await run_in_threadpool(_whitelist_count)
+
+async def iter_addresses(addresses: Iterable[str]) -> AsyncIterator[str]:
+    for address in addresses:
+        yield address
+
+async def stream_batch_verification(
+    addresses: AsyncIterator[str],
+    collections: CollectionsSnapshot,
+    total: Optional[int] = None,
+    concurrency: int = 10,
+    stop_on_match: bool = False,
+    refresh: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """Verify many wallets with at most ``concurrency`` XRPL scans in flight.
+
+    Yields one record per wallet in completion order, each carrying
+    ``completed``/``total`` progress, followed by a final summary record
+    (with an ``error`` when reading ``addresses`` failed part way).
+    Queues between the stages are bounded, so memory use does not grow
+    with the number of wallets.
+    """
+    pending: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=concurrency * 2)
+    done: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=concurrency * 2)
+
+    source_error: Optional[str] = None
+
+    async def produce():
+        nonlocal source_error
+        try:
+            async for address in addresses:
+                await pending.put(address)
+        except Exception as e:
+            # Stop feeding; the wallets already queued are still verified.
+            logger.error(f"Batch verification address source failed: {str(e)}")
+            source_error = str(e)
+        finally:
+            for _ in range(concurrency):
+                await pending.put(None)
+
+    async def work():
+        while True:
+            address = await pending.get()
+            if address is None:
+                await done.put(None)
+                return
+            try:
+                if stop_on_match:
+                    # Partial scans are not cached alongside full results.
+                    result = None if refresh else await verify_from_index(address, collections)
+                    if result is None:
+                        result = await xrpl_service.verify_nft_ownership(
+                            address, collections.matcher, stop_on_match=True
+                        )
+                else:
+                    result, _ = await verify_wallet(address, collections, refresh=refresh)
+                await done.put({"type": "result", "result": result})
+            except Exception as e:
+                await done.put({"type": "error", "wallet_address": address, "error": str(e)})
+
+    tasks = [asyncio.ensure_future(produce())]
+    tasks += [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    completed = holders = errors = 0
+    try:
+        finished_workers = 0
+        while finished_workers < concurrency:
+            record = await done.get()
+            if record is None:
+                finished_workers += 1
+                continue
+            completed += 1
+            if record["type"] == "error":
+                errors += 1
+            elif record["result"]["has_tracked_nfts"]:
+                holders += 1
+            yield {**record, "completed": completed, "total": total}
+        await tasks[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "type": "summary",
+        "completed": completed,
+        "total": total,
+        "holders": holders,
+        "errors": errors,
+        **({"error": f"Address source failed: {source_error}"} if source_error else {})
+    }
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "nft_verification": {
+            **verification_cache.stats(),
+            "single_flight": verification_flights.stats()
+        }
+    }
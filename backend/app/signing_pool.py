@@ -0,0 +1,101 @@
+"""
+Worker pool for XRPL key derivation and signature checks
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# secp256k1/ed25519 run in pure Python; "process" keeps them off the GIL,
+# "thread" only keeps them off the event loop and the request threadpool.
+SIGNATURE_POOL = os.getenv("SIGNATURE_POOL", "process").lower()
+SIGNATURE_POOL_SIZE = int(os.getenv("SIGNATURE_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+SIGNATURE_BATCH_CHUNK = int(os.getenv("SIGNATURE_BATCH_CHUNK", "64"))
+
+# xrpl-py is imported inside the workers, not when the app starts.
+
+def derive_address(public_key: str) -> str:
+    from xrpl.core.keypairs import derive_classic_address
+    return derive_classic_address(public_key)
+
+def check_signature(message: bytes, signature: str, public_key: str) -> bool:
+    """Whether ``signature`` (hex) signs ``message`` for ``public_key``"""
+    from xrpl.core.keypairs import is_valid_message
+    return is_valid_message(message, bytes.fromhex(signature), public_key)
+
+def check_signed_message(message: str, signature: str, public_key: str, wallet_address: Optional[str] = None) -> Dict[str, Any]:
+    """Derive the signer's address and check the signature, reporting errors instead of raising"""
+    result: Dict[str, Any] = {"valid": False, "address": None, "error": None}
+    try:
+        result["address"] = derive_address(public_key)
+        if wallet_address is not None and result["address"] != wallet_address:
+            result["error"] = "Public key does not match wallet address"
+            return result
+        result["valid"] = check_signature(message.encode("utf-8"), signature, public_key)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def _check_chunk(items: Sequence[Tuple[str, str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+    return [check_signed_message(*item) for item in items]
+
+class SigningPool:
+    """Bounded executor for signature work, created on first use"""
+
+    def __init__(self, kind: str = SIGNATURE_POOL, size: int = SIGNATURE_POOL_SIZE):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown SIGNATURE_POOL: {kind}")
+        self.kind = kind
+        self.size = size
+        self.tasks = 0
+        self._executor: Optional[Executor] = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # Spawned, not forked: the server process already runs threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="signing")
+        return self._executor
+
+    async def run(self, fn, *args):
+        self.tasks += 1
+        executor = self._pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenExecutor:
+            # A dead worker breaks the whole pool; start a fresh one next time.
+            logger.error("Signing pool broke, restarting it")
+            if self._executor is executor:
+                self._executor = None
+            raise
+
+    async def derive_address(self, public_key: str) -> str:
+        return await self.run(derive_address, public_key)
+
+    async def check_signature(self, message: bytes, signature: str, public_key: str) -> bool:
+        return await self.run(check_signature, message, signature, public_key)
+
+    async def check_batch(self, items: Sequence[Tuple[str, str, str, Optional[str]]], chunk_size: int = SIGNATURE_BATCH_CHUNK) -> List[Dict[str, Any]]:
+        """Check ``(message, signature, public_key, wallet_address)`` tuples in parallel chunks"""
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        results = await asyncio.gather(*(self.run(_check_chunk, chunk) for chunk in chunks))
+        return [result for chunk in results for result in chunk]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "size": self.size, "started": self._executor is not None, "tasks": self.tasks}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+signing_pool = SigningPool()
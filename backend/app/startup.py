@@ -0,0 +1,115 @@
+"""
+Cold-start timing and one-off initialisation.
+
+    python -m app.startup            # import/startup timing report
+    python -m app.startup --json     # same, machine readable
+    python -m app.startup --init-db  # prepare the database, e.g. before scaling out with DB_INIT=skip
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+# Print a per-phase report once the app has started.
+STARTUP_TIMING = os.getenv("STARTUP_TIMING", "false").lower() in ("1", "true", "yes")
+
+# Heavy third-party imports first, then app modules in app.main's import order,
+# so each line only counts what it adds.
+PROFILED_IMPORTS = [
+    "fastapi",
+    "pydantic",
+    "sqlalchemy.orm",
+    "httpx",
+    "jose.jwt",
+    "bcrypt",
+    "app.models",
+    "app.db_models",
+    "app.admin_roles",
+    "app.auth",
+    "app.xrpl_service",
+    "app.whitelist_query",
+    "app.whitelist_writes",
+    "app.whitelist_import",
+    "app.exports",
+    "app.challenge_store",
+    "app.collections_cache",
+    "app.nft_verification",
+    "app.signing_pool",
+    "app.wallet_auth",
+    "app.main",
+]
+
+class StartupTimer:
+    """Collects named phase durations from process start to app ready"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "phases": [{"name": name, "ms": round(seconds * 1000, 1)} for name, seconds in self.phases],
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1)
+        }
+
+    def print_report(self):
+        report = self.report()
+        for phase in report["phases"]:
+            print(f"{phase['ms']:>9.1f} ms  {phase['name']}")
+        print(f"{report['total_ms']:>9.1f} ms  total")
+
+startup_timer = StartupTimer()
+
+def profile_cold_start() -> Dict[str, Any]:
+    """Import the app module by module, then run its startup and shutdown hooks"""
+    for name in PROFILED_IMPORTS:
+        already = name in sys.modules
+        with startup_timer.phase(f"import {name}"):
+            importlib.import_module(name)
+        if already:
+            startup_timer.phases.pop()
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app):
+        pass
+    return startup_timer.report()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--init-db", action="store_true", help="create/upgrade the schema and exit")
+    args = parser.parse_args()
+
+    if args.init_db:
+        from app.db_models import init_db
+        with startup_timer.phase("init_db"):
+            init_db(force=True)
+        print(f"Database initialised in {startup_timer.phases[-1][1] * 1000:.1f} ms")
+        return
+
+    report = profile_cold_start()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        startup_timer.print_report()
+
+if __name__ == "__main__":
+    # Run through the package module so app.main shares this timer.
+    from app.startup import main
+    main()
@@ -6,8 +6,10 @@ from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from xrpl.core.keypairs import verify, derive_classic_address
-from .db_models import AdminWalletDB, AuthChallengeDB, AdminRole
+from .admin_roles import admin_roles
+from .db_models import AdminWalletDB, AdminRole, DBRunner
+from .signing_pool import signing_pool
+from .challenge_store import Challenge, challenge_store
 import os
 
 CHALLENGE_EXPIRY_MINUTES = 5
@@ -27,17 +29,13 @@ Nonce: {nonce}
 Issued At: {issued_at.isoformat()}Z
 Expires At: {expires_at.isoformat()}Z"""
     
-    challenge = AuthChallengeDB(
+    challenge_store.save(db, Challenge(
         id=challenge_id,
         wallet_address=wallet_address,
         nonce=nonce,
         message=message,
-        expires_at=expires_at,
-        used=False
-    )
-    
-    db.add(challenge)
-    db.commit()
+        expires_at=expires_at
+    ))
     
     return {
         "challenge_id": challenge_id,
@@ -45,45 +43,47 @@ Expires At: {expires_at.isoformat()}Z"""
         "expires_at": expires_at.isoformat()
     }
 
-def verify_challenge(
-    db: Session,
+def _challenge_rejection(db: Session, challenge_id: str, wallet_address: str) -> HTTPException:
+    """Explain why a challenge could not be consumed"""
+    challenge = challenge_store.get(db, challenge_id)
+    if challenge is None:
+        detail = "Invalid challenge ID"
+    elif challenge.wallet_address != wallet_address:
+        detail = "Wallet address mismatch"
+    elif challenge.used:
+        detail = "Challenge already used"
+    else:
+        detail = "Challenge expired"
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+def consume_challenge(db: Session, challenge_id: str, wallet_address: str) -> Challenge:
+    """Mark the challenge used, raising if it cannot be redeemed"""
+    challenge = challenge_store.consume(db, challenge_id, wallet_address)
+    if challenge is None:
+        raise _challenge_rejection(db, challenge_id, wallet_address)
+    return challenge
+
+def get_admin_wallet(db: Session, wallet_address: str) -> Optional[AdminWalletDB]:
+    return db.query(AdminWalletDB).filter(
+        AdminWalletDB.wallet_address == wallet_address
+    ).first()
+
+async def verify_challenge(
+    db: DBRunner,
     challenge_id: str,
     wallet_address: str,
     signature: str,
     public_key: str
-) -> Optional[AdminWalletDB]:
-    """Verify a signed challenge and return admin wallet if valid"""
-    
-    challenge = db.query(AuthChallengeDB).filter(
-        AuthChallengeDB.id == challenge_id
-    ).first()
-    
-    if not challenge:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid challenge ID"
-        )
-    
-    if challenge.used:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Challenge already used"
-        )
-    
-    if datetime.utcnow() > challenge.expires_at:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Challenge expired"
-        )
-    
-    if challenge.wallet_address != wallet_address:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Wallet address mismatch"
-        )
+) -> AdminWalletDB:
+    """Verify a signed challenge and return admin wallet if valid.
+
+    Key derivation and the signature check run on the signing pool. The
+    challenge is consumed before the signature is checked, so every
+    challenge allows exactly one verification attempt.
+    """
     
     try:
-        derived_address = derive_classic_address(public_key)
+        derived_address = await signing_pool.derive_address(public_key)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -96,10 +96,12 @@ def verify_challenge(
             detail="Public key does not match wallet address"
         )
     
+    challenge = await db.run(consume_challenge, challenge_id, wallet_address)
+    
     message_bytes = challenge.message.encode('utf-8')
     
     try:
-        is_valid = verify(message_bytes, signature, public_key)
+        is_valid = await signing_pool.check_signature(message_bytes, signature, public_key)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -112,12 +114,7 @@ def verify_challenge(
             detail="Invalid signature"
         )
     
-    challenge.used = True
-    db.commit()
-    
-    admin_wallet = db.query(AdminWalletDB).filter(
-        AdminWalletDB.wallet_address == wallet_address
-    ).first()
+    admin_wallet = await db.run(get_admin_wallet, wallet_address)
     
     if not admin_wallet:
         raise HTTPException(
@@ -127,13 +124,6 @@ def verify_challenge(
     
     return admin_wallet
 
-def is_super_admin(db: Session, wallet_address: str) -> bool:
-    """Check if a wallet address is a super admin"""
-    admin = db.query(AdminWalletDB).filter(
-        AdminWalletDB.wallet_address == wallet_address
-    ).first()
-    return admin and admin.role == AdminRole.super_admin
-
 def add_admin_wallet(
     db: Session,
     wallet_address: str,
@@ -159,6 +149,7 @@ def add_admin_wallet(
     )
     
     db.add(admin)
+    admin_roles.invalidate(db)
     db.commit()
     db.refresh(admin)
     
@@ -183,6 +174,7 @@ def remove_admin_wallet(db: Session, wallet_address: str, removed_by: str) -> bo
         )
     
     db.delete(admin)
+    admin_roles.invalidate(db)
     db.commit()
     
     return True
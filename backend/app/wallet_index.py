@@ -0,0 +1,193 @@
+"""
+In-process index of whitelisted wallets for fast membership checks
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .cache import TTLCache
+from .db_models import DBRunner, SessionLocal, WhitelistEntryDB, get_cache_version, bump_cache_version
+
+logger = logging.getLogger(__name__)
+
+WALLET_INDEX_ENABLED = os.getenv("WALLET_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+# How quickly clears made by other workers are noticed.
+WALLET_INDEX_REFRESH_INTERVAL = float(os.getenv("WALLET_INDEX_REFRESH_INTERVAL", "5"))
+WALLET_INDEX_MISS_TTL = float(os.getenv("WALLET_INDEX_MISS_TTL", "2"))
+WALLET_INDEX_MISS_CACHE_SIZE = int(os.getenv("WALLET_INDEX_MISS_CACHE_SIZE", "100000"))
+# Wallets added since the last load before the index is rebuilt compactly.
+WALLET_INDEX_REBUILD_AFTER = int(os.getenv("WALLET_INDEX_REBUILD_AFTER", "50000"))
+WHITELIST_CLEARS_KEY = "whitelist_clears"
+LOAD_BATCH_SIZE = 10000
+
+def wallet_key(wallet_address: str) -> int:
+    """64-bit digest of an address; collisions are negligible below billions of wallets"""
+    return int.from_bytes(hashlib.blake2b(wallet_address.encode("utf-8"), digest_size=8).digest(), "big")
+
+def _in_sorted(keys: array, key: int) -> bool:
+    i = bisect_left(keys, key)
+    return i < len(keys) and keys[i] == key
+
+def _clear_generation() -> int:
+    db = SessionLocal()
+    try:
+        return get_cache_version(db, WHITELIST_CLEARS_KEY)
+    finally:
+        db.close()
+
+def _load_keys() -> Tuple[int, array]:
+    db = SessionLocal()
+    try:
+        generation = get_cache_version(db, WHITELIST_CLEARS_KEY)
+        query = (
+            db.query(WhitelistEntryDB.wallet_address)
+            .execution_options(stream_results=True)
+            .yield_per(LOAD_BATCH_SIZE)
+        )
+        keys = array("Q", sorted(wallet_key(wallet) for (wallet,) in query))
+        return generation, keys
+    finally:
+        db.close()
+
+def wallet_exists(db: Session, wallet_address: str) -> bool:
+    return db.query(WhitelistEntryDB.id).filter(WhitelistEntryDB.wallet_address == wallet_address).first() is not None
+
+def record_clear(db: Session):
+    """Tell every worker's index the whitelist was emptied; call before committing"""
+    bump_cache_version(db, WHITELIST_CLEARS_KEY)
+
+class WalletIndex:
+    """Whitelisted wallets as a sorted array of 64-bit digests plus recent additions.
+
+    About 8 bytes per wallet. Wallets in the index are answered without a
+    query; others are looked up in the database (other workers may have
+    registered them) and negative answers are reused for a couple of
+    seconds. Local inserts and clears apply immediately; clears made by
+    other workers are picked up by the periodic refresh.
+    """
+
+    def __init__(self, enabled: bool = WALLET_INDEX_ENABLED, refresh_interval: float = WALLET_INDEX_REFRESH_INTERVAL):
+        self.enabled = enabled
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._keys = array("Q")
+        self._recent: Set[int] = set()
+        self._generation: Optional[int] = None
+        self._epoch = 0  # bumped by local clears so an in-flight load is discarded
+        self._stale = False
+        self._absent = TTLCache(maxsize=WALLET_INDEX_MISS_CACHE_SIZE, ttl=WALLET_INDEX_MISS_TTL)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._generation is not None
+
+    def _has(self, key: int) -> bool:
+        return key in self._recent or _in_sorted(self._keys, key)
+
+    def known(self, wallet_address: str) -> bool:
+        """Index-only check: False means "ask the database"; True may predate another worker's clear"""
+        return self._has(wallet_key(wallet_address))
+
+    async def contains(self, db: DBRunner, wallet_address: str) -> bool:
+        key = wallet_key(wallet_address)
+        if self._has(key):
+            self.hits += 1
+            return True
+        if self._absent.get(wallet_address) is not None:
+            self.hits += 1
+            return False
+        self.misses += 1
+        found = await db.run(wallet_exists, wallet_address)
+        if found:
+            self.add([wallet_address])
+        else:
+            self._absent.set(wallet_address, True)
+        return found
+
+    def add(self, wallet_addresses: Iterable[str]):
+        if self.enabled:
+            self._recent.update(wallet_key(wallet) for wallet in wallet_addresses)
+
+    def mark_stale(self):
+        """Reload on the next refresh, e.g. after a bulk import"""
+        self._stale = True
+
+    def clear(self):
+        self._keys = array("Q")
+        self._recent = set()
+        self._absent.clear()
+        self._epoch += 1
+        # Re-read the clear counter (including this clear) on the next refresh.
+        self._generation = None
+
+    async def load(self):
+        epoch = self._epoch
+        self._stale = False
+        generation, keys = await run_in_threadpool(_load_keys)
+        if epoch != self._epoch:
+            return
+        # Inserts made while loading stay in _recent.
+        self._keys = keys
+        self._recent = {key for key in self._recent if not _in_sorted(keys, key)}
+        self._absent.clear()
+        self._generation = generation
+        self.loads += 1
+
+    async def refresh(self):
+        """Reload after a clear elsewhere, an import, or when recent additions have piled up"""
+        if self.loaded and not self._stale and len(self._recent) < WALLET_INDEX_REBUILD_AFTER:
+            generation = await run_in_threadpool(_clear_generation)
+            if generation == self._generation:
+                return
+            # Another worker cleared the whitelist: stop trusting the index now.
+            self._keys = array("Q")
+            self._recent = set()
+            self._generation = None
+        await self.load()
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Wallet index refresh failed: {str(e)}")
+            if self.refresh_interval <= 0:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._recent)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "loaded": self.loaded,
+            "size": len(self),
+            "loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+wallet_index = WalletIndex()
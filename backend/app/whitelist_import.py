@@ -0,0 +1,300 @@
+"""
+Bulk whitelist import from streamed CSV or NDJSON
+"""
+import asyncio
+import codecs
+import csv
+import json
+import os
+import queue
+import re
+import threading
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from fastapi import Request
+from starlette.requests import ClientDisconnect
+from email_validator.rfc_constants import CASE_INSENSITIVE_MAILBOX_NAMES
+from pydantic import TypeAdapter, ValidationError
+from pydantic.networks import validate_email
+from pydantic_core import PydanticCustomError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .db_models import SessionLocal, WhitelistEntryDB
+from .models import WhitelistCreate
+from .whitelist_writes import build_entry_row, record_whitelist_change
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_REPORT_LIMIT = int(os.getenv("IMPORT_REPORT_LIMIT", "1000"))
+IMPORT_QUEUE_CHUNKS = 16
+# How often a waiting importer checks whether the upload was abandoned.
+IMPORT_ABORT_POLL = 0.5
+
+class ImportReport:
+    def __init__(self, report_limit: int = IMPORT_REPORT_LIMIT):
+        self.report_limit = report_limit
+        self.received = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.error: Optional[str] = None
+        self.rows: List[Dict[str, Any]] = []
+
+    def add(self, row: int, wallet_address: Optional[str], status: str, reason: str):
+        if status == "duplicate":
+            self.duplicates += 1
+        else:
+            self.rejected += 1
+        if len(self.rows) < self.report_limit:
+            self.rows.append({
+                "row": row,
+                "wallet_address": wallet_address,
+                "status": status,
+                "reason": reason
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = {
+            "received": self.received,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "rows": self.rows,
+            "rows_truncated": self.duplicates + self.rejected > len(self.rows)
+        }
+        if self.error is not None:
+            report["error"] = self.error
+        return report
+
+class ImportDecodeError(ValueError):
+    """The body is not valid UTF-8 at byte ``offset``"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Body is not valid UTF-8 (byte {offset})")
+        self.offset = offset
+
+class ImportAborted(Exception):
+    """The upload ended before its last byte, e.g. the client disconnected"""
+
+def _iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    offset = 0
+    for chunk in chunks:
+        try:
+            pending += decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise ImportDecodeError(offset + e.start) from e
+        offset += len(chunk)
+        lines = pending.splitlines(keepends=True)
+        # The last piece may be an unterminated line continued by the next chunk.
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+    try:
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as e:
+        raise ImportDecodeError(offset) from e
+    if pending:
+        yield pending
+
+def _iter_records(lines: Iterator[str], fmt: str) -> Iterator[Any]:
+    if fmt == "csv":
+        for record in csv.DictReader(lines):
+            yield {k: (v if v != "" else None) for k, v in record.items() if k}
+    else:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+
+class _PrevalidatedWhitelistCreate(WhitelistCreate):
+    """WhitelistCreate whose email was already checked by ``_fast_email``"""
+    email: str
+
+_batch_adapter = TypeAdapter(List[WhitelistCreate])
+_prevalidated_adapter = TypeAdapter(List[_PrevalidatedWhitelistCreate])
+
+# Plain ASCII dot-atom addresses: for these EmailStr only differs on the
+# domain, so each distinct domain is validated once and reused.
+_SIMPLE_EMAIL = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*@([A-Za-z0-9.-]+)")
+
+@lru_cache(maxsize=4096)
+def _normalized_domain(domain: str) -> Optional[str]:
+    try:
+        _, normalized = validate_email(f"postmaster@{domain}")
+    except PydanticCustomError:
+        return None
+    return normalized.partition("@")[2]
+
+def _fast_email(value: Any) -> Optional[str]:
+    """Normalized email when it is a simple address with a valid domain, else None"""
+    if not isinstance(value, str) or len(value) > 254:
+        return None
+    match = _SIMPLE_EMAIL.fullmatch(value)
+    if match is None:
+        return None
+    local = value[:match.start(1) - 1]
+    domain = _normalized_domain(match.group(1))
+    if domain is None or len(local) > 64 or local.lower() in CASE_INSENSITIVE_MAILBOX_NAMES:
+        return None
+    return f"{local}@{domain}"
+
+def _validate_group(adapter: TypeAdapter, indexes: List[int], payloads: List[Any], errors: Dict[int, str]) -> Dict[int, WhitelistCreate]:
+    try:
+        return dict(zip(indexes, adapter.validate_python(payloads)))
+    except ValidationError as e:
+        failed = set()
+        for error in e.errors():
+            position = error["loc"][0]
+            failed.add(position)
+            if indexes[position] not in errors:
+                field = ".".join(str(part) for part in error["loc"][1:])
+                errors[indexes[position]] = f"{field}: {error['msg']}"
+    survivors = [n for n in range(len(indexes)) if n not in failed]
+    models = adapter.validate_python([payloads[n] for n in survivors])
+    return {indexes[n]: model for n, model in zip(survivors, models)}
+
+def _validate_batch(records: List[Any]) -> Tuple[Dict[int, WhitelistCreate], Dict[int, str]]:
+    """Validate a batch against the WhitelistCreate rules in bulk.
+
+    Returns the valid rows and ``{index: reason}`` for the rejected ones.
+    Rows are validated in at most two pydantic calls (simple emails and
+    everything else); only a failing group is re-validated.
+    """
+    errors: Dict[int, str] = {}
+    fast_indexes, fast_payloads = [], []
+    slow_indexes, slow_payloads = [], []
+    for i, record in enumerate(records):
+        if isinstance(record, ValueError):
+            errors[i] = f"Invalid JSON: {record}"
+        elif not isinstance(record, dict):
+            errors[i] = "Row is not an object"
+        else:
+            email = _fast_email(record.get("email"))
+            if email is not None:
+                fast_indexes.append(i)
+                fast_payloads.append({**record, "email": email})
+            else:
+                slow_indexes.append(i)
+                slow_payloads.append(record)
+
+    valid = {}
+    if fast_indexes:
+        valid.update(_validate_group(_prevalidated_adapter, fast_indexes, fast_payloads, errors))
+    if slow_indexes:
+        valid.update(_validate_group(_batch_adapter, slow_indexes, slow_payloads, errors))
+    return valid, errors
+
+def _insert_ignoring_duplicates(db: Session, rows: List[Dict[str, Any]]) -> set:
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING; returns the wallets inserted"""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = (
+        dialect.insert(WhitelistEntryDB.__table__)
+        .on_conflict_do_nothing(index_elements=["wallet_address"])
+        .returning(WhitelistEntryDB.wallet_address)
+    )
+    inserted = set(db.execute(stmt, rows).scalars())
+    if inserted:
+        record_whitelist_change(db, [row for row in rows if row["wallet_address"] in inserted])
+    db.commit()
+    return inserted
+
+def import_entries(db: Session, chunks: Iterable[bytes], fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    report = ImportReport()
+    records = _iter_records(_iter_lines(chunks), fmt)
+    row_number = 0
+    while True:
+        try:
+            batch = list(islice(records, batch_size))
+        except (ImportDecodeError, ImportAborted) as e:
+            # Batches before this one are already committed.
+            report.error = str(e)
+            break
+        if not batch:
+            break
+        report.received += len(batch)
+        valid, errors = _validate_batch(batch)
+
+        rows = []
+        row_numbers = []
+        seen = set()
+        for i, record in enumerate(batch):
+            number = row_number + i + 1
+            wallet = record.get("wallet_address") if isinstance(record, dict) else None
+            if i in errors:
+                report.add(number, wallet, "rejected", errors[i])
+            elif wallet in seen:
+                report.add(number, wallet, "duplicate", "Wallet address repeated in import")
+            else:
+                seen.add(wallet)
+                rows.append(build_entry_row(valid[i]))
+                row_numbers.append(number)
+        row_number += len(batch)
+
+        if rows:
+            inserted = _insert_ignoring_duplicates(db, rows)
+            report.inserted += len(inserted)
+            for number, row in zip(row_numbers, rows):
+                if row["wallet_address"] not in inserted:
+                    report.add(number, row["wallet_address"], "duplicate", "Wallet address already registered")
+    return report.to_dict()
+
+def _drain(chunks: "queue.Queue[Optional[bytes]]", aborted: threading.Event) -> Iterator[bytes]:
+    """Chunks up to the ``None`` sentinel; raises ImportAborted once ``aborted`` is set and the queue is empty"""
+    while True:
+        try:
+            chunk = chunks.get(timeout=IMPORT_ABORT_POLL)
+        except queue.Empty:
+            if aborted.is_set():
+                raise ImportAborted("Upload ended before the body was complete")
+            continue
+        if chunk is None:
+            return
+        yield chunk
+
+def _import_in_session(chunks: "queue.Queue[Optional[bytes]]", aborted: threading.Event, fmt: str) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        return import_entries(db, _drain(chunks, aborted), fmt)
+    finally:
+        db.close()
+
+async def import_request_body(request: Request, fmt: str) -> Dict[str, Any]:
+    """Feed the request body to the importer as it arrives.
+
+    Parsing, validation and inserts run on a worker thread; the bounded
+    chunk queue between the two keeps memory flat however large the upload.
+    If the client disconnects, the importer stops after the last full batch
+    and the report carries an ``error``.
+    """
+    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=IMPORT_QUEUE_CHUNKS)
+    aborted = threading.Event()
+    result = asyncio.ensure_future(run_in_threadpool(_import_in_session, chunks, aborted, fmt))
+    try:
+        async for chunk in request.stream():
+            while not result.done():
+                try:
+                    chunks.put_nowait(chunk)
+                    break
+                except queue.Full:
+                    await asyncio.sleep(0.005)
+            if result.done():
+                break
+    except ClientDisconnect:
+        aborted.set()
+    except BaseException:
+        # Never leave the importer thread waiting for chunks that will not come.
+        aborted.set()
+        raise
+    else:
+        while not result.done():
+            try:
+                chunks.put_nowait(None)
+                break
+            except queue.Full:
+                await asyncio.sleep(0.005)
+    return await result
@@ -0,0 +1,92 @@
+"""
+Keyset pagination, filters and cached counts for whitelist listings
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+from .cache import TTLCache
+from .db_models import DBRunner, WhitelistEntryDB
+from .whitelist_stats import read_count
+
+WHITELIST_PAGE_DEFAULT = 100
+WHITELIST_PAGE_MAX = 1000
+WHITELIST_COUNT_CACHE_TTL = float(os.getenv("WHITELIST_COUNT_CACHE_TTL", "30"))
+
+count_cache = TTLCache(maxsize=256, ttl=WHITELIST_COUNT_CACHE_TTL)
+
+# Columns of the WhitelistEntry response, in schema order.
+ENTRY_FIELDS = (
+    "id", "full_name", "email", "wallet_address", "street_address", "city",
+    "state_province", "zip_postal", "country", "phone_number", "created_at",
+)
+ENTRY_COLUMNS = tuple(getattr(WhitelistEntryDB, field) for field in ENTRY_FIELDS)
+
+def encode_cursor(entry: Any) -> str:
+    """Cursor after ``entry``, an ORM object or a row with ``created_at`` and ``id``"""
+    raw = json.dumps([entry.created_at.isoformat(), entry.id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Raises ValueError for anything that is not a cursor we issued"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, entry_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(entry_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _prefix_upper_bound(prefix: str) -> str:
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def filter_entries(
+    query: Query,
+    country: Optional[str] = None,
+    email_domain: Optional[str] = None,
+    wallet_prefix: Optional[str] = None
+) -> Query:
+    if country:
+        query = query.filter(WhitelistEntryDB.country == country)
+    if email_domain:
+        query = query.filter(WhitelistEntryDB.email_domain == email_domain.lower())
+    if wallet_prefix:
+        # A range rather than LIKE so the unique wallet index is used on every backend.
+        query = query.filter(
+            WhitelistEntryDB.wallet_address >= wallet_prefix,
+            WhitelistEntryDB.wallet_address < _prefix_upper_bound(wallet_prefix)
+        )
+    return query
+
+def after_cursor(query: Query, cursor: str) -> Query:
+    created_at, entry_id = decode_cursor(cursor)
+    return query.filter(or_(
+        WhitelistEntryDB.created_at < created_at,
+        and_(WhitelistEntryDB.created_at == created_at, WhitelistEntryDB.id < entry_id)
+    ))
+
+def _count_filtered(db: Session, *filters: Optional[str]) -> int:
+    return filter_entries(db.query(WhitelistEntryDB), *filters).count()
+
+async def count_entries(
+    db: DBRunner,
+    country: Optional[str] = None,
+    email_domain: Optional[str] = None,
+    wallet_prefix: Optional[str] = None
+) -> int:
+    """Exact from the maintained stats when filtering by country at most, else cached for a while"""
+    key = (country or None, (email_domain or "").lower() or None, wallet_prefix or None)
+    if key[1] is None and key[2] is None:
+        count = await db.run(read_count, key[0])
+        if count is not None:
+            return count
+    count = count_cache.get(key)
+    if count is None:
+        count = await db.run(_count_filtered, *key)
+        count_cache.set(key, count)
+    return count
+
+def invalidate_counts():
+    count_cache.clear()
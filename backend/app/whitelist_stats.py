@@ -0,0 +1,206 @@
+"""
+Whitelist aggregates for the admin dashboard, maintained on every write
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import tempfile
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, IO, Iterable, Optional
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .db_models import DATABASE_URL, SessionLocal, WhitelistEntryDB, WhitelistStatDB
+
+logger = logging.getLogger(__name__)
+
+# Full recounts correcting any drift; 0 only fills missing stats at startup.
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+# Held by the one worker per host that reconciles; defaults to a per-database temp file.
+STATS_LOCK_PATH = os.getenv("STATS_LOCK_PATH") or os.path.join(
+    tempfile.gettempdir(), f"xrpl-whitelist-stats-{zlib.crc32(DATABASE_URL.encode('utf-8')):08x}.lock"
+)
+STATS_HOURS_DEFAULT = 24
+STATS_HOURS_MAX = 24 * 30
+
+HOUR_FORMAT = "%Y-%m-%dT%H:00:00"
+
+def hour_key(created_at: datetime) -> str:
+    return created_at.strftime(HOUR_FORMAT)
+
+def _hour_expression(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(WhitelistEntryDB.created_at, 'YYYY-MM-DD"T"HH24:00:00')
+    return func.strftime(HOUR_FORMAT, WhitelistEntryDB.created_at)
+
+def count_inserts(db: Session, rows: Iterable[Dict[str, Any]]):
+    """Add inserted entries to the aggregates inside the caller's transaction"""
+    deltas: Counter = Counter()
+    for row in rows:
+        deltas["total", ""] += 1
+        deltas["country", row["country"]] += 1
+        deltas["hour", hour_key(row["created_at"])] += 1
+    if not deltas:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(WhitelistStatDB.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dimension", "key"],
+        set_={"count": WhitelistStatDB.__table__.c["count"] + stmt.excluded["count"]}
+    )
+    db.execute(stmt, [
+        {"dimension": dimension, "key": key, "count": count}
+        for (dimension, key), count in deltas.items()
+    ])
+
+def reset_stats(db: Session):
+    """Zero the aggregates along with the entries; call inside the clear's transaction"""
+    db.execute(delete(WhitelistStatDB))
+    db.execute(insert(WhitelistStatDB.__table__), [{"dimension": "total", "key": "", "count": 0}])
+
+def read_count(db: Session, country: Optional[str] = None) -> Optional[int]:
+    """Entries in total or in one country; None until the stats have been filled in"""
+    total = db.query(WhitelistStatDB.count).filter(
+        WhitelistStatDB.dimension == "total", WhitelistStatDB.key == ""
+    ).scalar()
+    if total is None or not country:
+        return total
+    count = db.query(WhitelistStatDB.count).filter(
+        WhitelistStatDB.dimension == "country", WhitelistStatDB.key == country
+    ).scalar()
+    return count or 0
+
+def reconcile(db: Session) -> int:
+    """Recount every aggregate from the entries table; returns the total.
+
+    The ``total`` row, which every insert updates, is locked first so
+    writers wait for the recount instead of having their increments lost.
+    On SQLite the initial delete takes the write lock for the same effect.
+    """
+    db.query(WhitelistStatDB).filter(WhitelistStatDB.dimension == "total").with_for_update().all()
+    db.execute(delete(WhitelistStatDB))
+    hour = _hour_expression(db)
+    countries = db.query(WhitelistEntryDB.country, func.count()).group_by(WhitelistEntryDB.country).all()
+    hours = db.query(hour, func.count()).group_by(hour).all()
+    total = sum(count for _, count in countries)
+    rows = [{"dimension": "total", "key": "", "count": total}]
+    rows.extend({"dimension": "country", "key": country, "count": count} for country, count in countries)
+    rows.extend({"dimension": "hour", "key": key, "count": count} for key, count in hours)
+    db.execute(insert(WhitelistStatDB.__table__), rows)
+    db.commit()
+    return total
+
+def read_stats(db: Session, hours: int = STATS_HOURS_DEFAULT, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Totals, per-country counts and signups for the last ``hours`` hours, from primary-key lookups"""
+    now = now or datetime.utcnow()
+    start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    rows = db.query(WhitelistStatDB.dimension, WhitelistStatDB.key, WhitelistStatDB.count).filter(
+        (WhitelistStatDB.dimension.in_(("total", "country"))) |
+        ((WhitelistStatDB.dimension == "hour") & (WhitelistStatDB.key >= hour_key(start)))
+    ).all()
+    total = 0
+    countries: Dict[str, int] = {}
+    per_hour: Dict[str, int] = {}
+    for dimension, key, count in rows:
+        if dimension == "total":
+            total = count
+        elif dimension == "country":
+            countries[key] = count
+        else:
+            per_hour[key] = count
+    slots = [hour_key(start + timedelta(hours=i)) for i in range(hours)]
+    return {
+        "total": total,
+        "countries": dict(sorted(countries.items(), key=lambda item: (-item[1], item[0]))),
+        "signups_per_hour": [{"hour": slot, "count": per_hour.get(slot, 0)} for slot in slots]
+    }
+
+def _stats_missing(db: Session) -> bool:
+    total = db.query(WhitelistStatDB.count).filter(WhitelistStatDB.dimension == "total").scalar()
+    return total is None and db.query(WhitelistEntryDB.id).first() is not None
+
+class StatsReconciler:
+    """Periodically recounts the aggregates, and fills them in at startup when missing.
+
+    Every worker starts one, but only the holder of an flock on
+    ``lock_path`` reconciles; the others try to take the lock over each
+    interval, which succeeds once its holder has exited or died.
+    """
+
+    def __init__(self, interval: float = STATS_RECONCILE_INTERVAL, lock_path: str = STATS_LOCK_PATH):
+        self.interval = interval
+        self.lock_path = lock_path
+        self.runs = 0
+        self._lock: Optional[IO] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def leader(self) -> bool:
+        return self._lock is not None
+
+    def _acquire_lock(self) -> bool:
+        """True if this process holds the lock, taking it when free; kept until the loop ends"""
+        if self._lock is None:
+            lock = open(self.lock_path, "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return False
+            self._lock = lock
+        return True
+
+    def _release_lock(self):
+        if self._lock is not None:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+            self._lock.close()
+            self._lock = None
+
+    def _reconcile(self, only_if_missing: bool = False):
+        db = SessionLocal()
+        try:
+            if only_if_missing and not _stats_missing(db):
+                return
+            total = reconcile(db)
+            self.runs += 1
+            logger.info(f"Whitelist stats reconciled ({total} entries)")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        only_if_missing = True
+        try:
+            while True:
+                try:
+                    if self._acquire_lock():
+                        await run_in_threadpool(self._reconcile, only_if_missing)
+                except Exception as e:
+                    logger.error(f"Whitelist stats reconciliation failed: {str(e)}")
+                if self.interval <= 0:
+                    return
+                only_if_missing = False
+                await asyncio.sleep(self.interval)
+        finally:
+            self._release_lock()
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+stats_reconciler = StatsReconciler()
@@ -0,0 +1,195 @@
+"""
+Whitelist signup writes, optionally group-committed
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .change_feed import log_inserts
+from .db_models import WhitelistEntryDB, bump_cache_version, email_domain_of, run_in_session
+from .models import WhitelistCreate, WhitelistEntry
+from .wallet_index import wallet_exists
+from .whitelist_stats import count_inserts
+
+logger = logging.getLogger(__name__)
+
+# Gather signups arriving within a few milliseconds into one transaction.
+WHITELIST_WRITE_BATCHING = os.getenv("WHITELIST_WRITE_BATCHING", "false").lower() in ("1", "true", "yes")
+WHITELIST_BATCH_WINDOW_MS = float(os.getenv("WHITELIST_BATCH_WINDOW_MS", "5"))
+WHITELIST_BATCH_MAX = int(os.getenv("WHITELIST_BATCH_MAX", "256"))
+WHITELIST_VERSION_KEY = "whitelist"
+
+def record_whitelist_change(db: Session, inserted: Iterable[Dict[str, Any]] = ()):
+    """Bump the whitelist version and add ``inserted`` rows to the change feed and stats.
+
+    Runs inside the caller's transaction. The version row stays locked until
+    commit, so feed sequence numbers taken after the bump follow commit order.
+    """
+    inserted = list(inserted)
+    bump_cache_version(db, WHITELIST_VERSION_KEY)
+    log_inserts(db, inserted)
+    count_inserts(db, inserted)
+
+def _duplicate_wallet() -> HTTPException:
+    return HTTPException(status_code=409, detail="Wallet address already registered")
+
+def build_entry_row(entry: WhitelistCreate) -> Dict[str, Any]:
+    """Column values for a new entry, generated up front so no refresh is needed"""
+    return {
+        "id": str(uuid.uuid4()),
+        "full_name": entry.full_name,
+        "email": entry.email,
+        "email_domain": email_domain_of(entry.email),
+        "wallet_address": entry.wallet_address,
+        "street_address": entry.street_address,
+        "city": entry.city,
+        "state_province": entry.state_province,
+        "zip_postal": entry.zip_postal,
+        "country": entry.country,
+        "phone_number": entry.phone_number,
+        "created_at": datetime.utcnow()
+    }
+
+def entry_from_row(row: Dict[str, Any]) -> WhitelistEntry:
+    return WhitelistEntry(
+        id=row["id"],
+        full_name=row["full_name"],
+        email=row["email"],
+        wallet_address=row["wallet_address"],
+        street_address=row["street_address"],
+        city=row["city"],
+        state_province=row["state_province"],
+        zip_postal=row["zip_postal"],
+        country=row["country"],
+        phone_number=row["phone_number"],
+        created_at=row["created_at"]
+    )
+
+def insert_entry(db: Session, row: Dict[str, Any]):
+    try:
+        db.execute(insert(WhitelistEntryDB.__table__), [row])
+        record_whitelist_change(db, [row])
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        # The version, feed and stats rows can violate constraints too; only
+        # a stored wallet makes this a duplicate.
+        if wallet_exists(db, row["wallet_address"]):
+            raise _duplicate_wallet()
+        logger.error(f"Whitelist insert failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def insert_entries(db: Session, rows: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+    """Insert a batch in one transaction; returns one outcome per row.
+
+    Duplicate wallets, whether within the batch or already stored, are
+    filtered out beforehand so one bad row does not abort the others. If
+    the batch still trips a constraint, it is retried row by row so each
+    row gets its own outcome.
+    """
+    outcomes: List[Optional[Exception]] = [None] * len(rows)
+    wallets = [row["wallet_address"] for row in rows]
+    existing = {
+        wallet for (wallet,) in db.query(WhitelistEntryDB.wallet_address)
+        .filter(WhitelistEntryDB.wallet_address.in_(wallets))
+    }
+    seen = set()
+    fresh = []
+    for i, row in enumerate(rows):
+        wallet = row["wallet_address"]
+        if wallet in existing or wallet in seen:
+            outcomes[i] = _duplicate_wallet()
+        else:
+            seen.add(wallet)
+            fresh.append((i, row))
+
+    if not fresh:
+        return outcomes
+    try:
+        db.execute(insert(WhitelistEntryDB.__table__), [row for _, row in fresh])
+        record_whitelist_change(db, [row for _, row in fresh])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        for i, row in fresh:
+            try:
+                insert_entry(db, row)
+            except HTTPException as e:
+                outcomes[i] = e
+    return outcomes
+
+class WhitelistWriteBatcher:
+    """Funnels concurrent signups into group commits.
+
+    The first queued signup opens a window of ``window_ms``; everything
+    arriving before it closes (up to ``max_batch``) is written in the same
+    transaction, paying for one commit instead of one per request.
+    """
+
+    def __init__(self, window_ms: float = WHITELIST_BATCH_WINDOW_MS, max_batch: int = WHITELIST_BATCH_MAX):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.rows = 0
+        self._queue: Optional["asyncio.Queue[Tuple[Dict[str, Any], asyncio.Future]]"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, row: Dict[str, Any]):
+        """Queue one row and wait for its transaction; raises HTTPException on failure"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        await future
+
+    async def _collect(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                outcomes = await run_in_session(insert_entries, [row for row, _ in batch])
+            except Exception as e:
+                logger.error(f"Whitelist batch insert failed: {str(e)}")
+                outcomes = [HTTPException(status_code=500, detail=str(e))] * len(batch)
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if outcome is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(outcome)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+whitelist_writer = WhitelistWriteBatcher()
@@ -1,45 +1,473 @@
-from xrpl.clients import JsonRpcClient
-from xrpl.models.requests import AccountNFTs
-from typing import List, Dict, Any
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple, Union
+import asyncio
+import httpx
 import logging
+import os
+import time
+from urllib.parse import urlsplit
+from .metrics import observe_xrpl
+
+# xrpl-py takes ~350 ms to import, so it is loaded on the first request
+# rather than when the app starts.
+if TYPE_CHECKING:
+    from xrpl.models.requests.request import Request
+    from xrpl.models.response import Response
 
 logger = logging.getLogger(__name__)
 
-XRPL_CLIENT_URL = "https://xrplcluster.com"
+XRPL_CLIENT_URL = os.getenv("XRPL_CLIENT_URL", "https://xrplcluster.com")
+# Comma-separated JSON-RPC endpoints; defaults to XRPL_CLIENT_URL alone.
+XRPL_NODES = [url.strip() for url in os.getenv("XRPL_NODES", XRPL_CLIENT_URL).split(",") if url.strip()]
+XRPL_REQUEST_TIMEOUT = float(os.getenv("XRPL_REQUEST_TIMEOUT", "10"))
+XRPL_MAX_CONCURRENCY = int(os.getenv("XRPL_MAX_CONCURRENCY", "20"))
+XRPL_MAX_KEEPALIVE = int(os.getenv("XRPL_MAX_KEEPALIVE", "10"))
+XRPL_NFT_PAGE_LIMIT = int(os.getenv("XRPL_NFT_PAGE_LIMIT", "400"))
+XRPL_ISSUER_PAGE_LIMIT = int(os.getenv("XRPL_ISSUER_PAGE_LIMIT", "100"))
+# Extra nodes tried after a failure, and the wait before hedging a slow call
+# on the next node (0 disables hedging).
+XRPL_RETRIES = int(os.getenv("XRPL_RETRIES", "2"))
+XRPL_HEDGE_DELAY_MS = float(os.getenv("XRPL_HEDGE_DELAY_MS", "300"))
+XRPL_EWMA_ALPHA = float(os.getenv("XRPL_EWMA_ALPHA", "0.3"))
+XRPL_BREAKER_FAILURES = int(os.getenv("XRPL_BREAKER_FAILURES", "5"))
+XRPL_BREAKER_COOLDOWN = float(os.getenv("XRPL_BREAKER_COOLDOWN", "30"))
+XRPL_HEALTH_INTERVAL = float(os.getenv("XRPL_HEALTH_INTERVAL", "15"))
 
-class XRPLService:
-    def __init__(self):
-        self.client = JsonRpcClient(XRPL_CLIENT_URL)
-    
-    async def get_account_nfts(self, wallet_address: str) -> List[Dict[str, Any]]:
+def node_label(url: str) -> str:
+    """``host[:port]`` of a node URL; paths and credentials may hold API keys"""
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname or "unknown"
+        return f"{host}:{parts.port}" if parts.port else host
+    except ValueError:
+        return "unknown"
+
+# rippled errors that describe the node rather than the request.
+NODE_ERRORS = {
+    "tooBusy", "slowDown", "noNetwork", "noCurrent", "noClosed",
+    "amendmentBlocked", "failedToForward", "internal", "lgrNotFound",
+}
+# rippled errors blaming the request, e.g. an address with a bad checksum.
+REQUEST_ERRORS = {"actMalformed", "invalidParams", "badMarker"}
+
+class XRPLServiceError(Exception):
+    """The XRPL could not answer the question; never cache this as a result"""
+
+class XRPLUnavailableError(XRPLServiceError):
+    """No node answered: transport failures, overloaded nodes or open breakers"""
+
+class XRPLRequestError(XRPLServiceError):
+    """The node rejected the request itself, so retrying cannot help"""
+
+class AsyncXRPLClient:
+    """JSON-RPC client sharing one keep-alive HTTP connection pool.
+
+    xrpl-py's ``AsyncJsonRpcClient`` opens a fresh connection for every
+    request; this keeps connections alive between calls and caps the number
+    of requests in flight against the node.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = XRPL_REQUEST_TIMEOUT,
+        max_concurrency: int = XRPL_MAX_CONCURRENCY,
+        max_keepalive: int = XRPL_MAX_KEEPALIVE,
+    ):
+        self.url = url
+        self.label = node_label(url)
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_keepalive = max_keepalive
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _session(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the running event loop.
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._http
+
+    async def request(self, request: "Request", timeout: Optional[float] = None) -> "Response":
+        from xrpl.asyncio.clients.exceptions import XRPLRequestFailureException
+        from xrpl.asyncio.clients.utils import json_to_response, request_to_json_rpc
+
+        http = self._session()
+        method = request.method.value
+        started = time.perf_counter()
+        async with self._semaphore:
+            try:
+                response = await http.post(
+                    self.url,
+                    json=request_to_json_rpc(request),
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            except httpx.HTTPError:
+                observe_xrpl(self.label, method, started, "transport")
+                raise
+        try:
+            result = json_to_response(response.json())
+        except ValueError:
+            observe_xrpl(self.label, method, started, "invalid_response")
+            raise XRPLRequestFailureException({
+                "error": response.status_code,
+                "error_message": response.text,
+            })
+        observe_xrpl(self.label, method, started, None if result.is_successful() else "rpc")
+        return result
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+class XRPLNode:
+    """One endpoint with its latency average and circuit breaker"""
+
+    def __init__(self, url: str, **client_options):
+        self.url = url
+        self.label = node_label(url)
+        self.client = AsyncXRPLClient(url, **client_options)
+        self.latency: Optional[float] = None  # EWMA of successful calls, seconds
+        self.failures = 0  # consecutive
+        self.open_until = 0.0
+
+    def available(self, now: float) -> bool:
+        # Once the cooldown passes the breaker is half-open: the next call is
+        # a trial, and one more failure re-opens it.
+        return self.open_until <= now
+
+    def record_latency(self, elapsed: float, alpha: float = XRPL_EWMA_ALPHA):
+        self.latency = elapsed if self.latency is None else alpha * elapsed + (1 - alpha) * self.latency
+
+    def record_success(self, elapsed: float):
+        self.record_latency(elapsed)
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, threshold: int = XRPL_BREAKER_FAILURES, cooldown: float = XRPL_BREAKER_COOLDOWN):
+        self.failures += 1
+        if self.failures >= threshold:
+            if self.open_until == 0.0:
+                logger.warning(f"XRPL node {self.label} marked unavailable after {self.failures} failures")
+            self.open_until = time.monotonic() + cooldown
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "node": self.label,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "consecutive_failures": self.failures,
+            "available": self.available(time.monotonic()),
+        }
+
+class XRPLNodePool:
+    """Routes JSON-RPC calls over several nodes.
+
+    Healthy nodes are tried fastest first by moving-average latency. Nodes
+    not yet measured count as taking ``hedge_delay_ms``, so they get measured
+    without going ahead of known-fast ones, and go last once they have
+    failed without ever answering. A failed call moves on to the next
+    node, and a call still running after ``hedge_delay_ms`` is duplicated on
+    the next node, the first answer winning. Nodes failing
+    ``XRPL_BREAKER_FAILURES`` times in a row are skipped for
+    ``XRPL_BREAKER_COOLDOWN`` seconds unless a health probe revives them.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str] = (),
+        retries: int = XRPL_RETRIES,
+        hedge_delay_ms: float = XRPL_HEDGE_DELAY_MS,
+        health_interval: float = XRPL_HEALTH_INTERVAL,
+    ):
+        self.nodes = [XRPLNode(url) for url in (list(urls) or XRPL_NODES)]
+        self.retries = retries
+        self.hedge_delay = hedge_delay_ms / 1000
+        self.health_interval = health_interval
+        self.hedges = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    def _rank_key(self, node: XRPLNode) -> Tuple[bool, float]:
+        if node.latency is not None:
+            return False, node.latency
+        return node.failures > 0, self.hedge_delay
+
+    def _ranked(self) -> List[XRPLNode]:
+        now = time.monotonic()
+        nodes = [node for node in self.nodes if node.available(now)]
+        nodes.sort(key=self._rank_key)
+        return nodes[:1 + self.retries]
+
+    async def _call(self, node: XRPLNode, request: "Request") -> "Response":
+        from xrpl.asyncio.clients.exceptions import XRPLRequestFailureException
+
+        started = time.perf_counter()
         try:
-            request = AccountNFTs(account=wallet_address)
-            response = self.client.request(request)
-            
-            if response.is_successful():
-                nfts = response.result.get("account_nfts", [])
-                return nfts
+            response = await node.client.request(request)
+        except asyncio.CancelledError:
+            # Lost a hedge race: count the time spent as a lower bound so a
+            # node that turned slow drops in the ranking.
+            node.record_latency(time.perf_counter() - started)
+            raise
+        except (httpx.HTTPError, XRPLRequestFailureException) as e:
+            node.record_failure()
+            raise XRPLUnavailableError(f"{node.label}: {str(e) or type(e).__name__}") from e
+        if not response.is_successful() and response.result.get("error") in NODE_ERRORS:
+            node.record_failure()
+            raise XRPLUnavailableError(f"{node.label}: {response.result.get('error')}")
+        node.record_success(time.perf_counter() - started)
+        return response
+
+    async def request(self, request: "Request") -> "Response":
+        self.start_health_checks()
+        nodes = self._ranked()
+        if not nodes:
+            raise XRPLUnavailableError("All XRPL nodes are unavailable")
+
+        pending = set()
+        errors: List[str] = []
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            pending.add(asyncio.ensure_future(self._call(nodes[launched], request)))
+            launched += 1
+
+        launch()
+        try:
+            while pending:
+                can_hedge = self.hedge_delay > 0 and launched < len(nodes)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    self.hedges += 1
+                    launch()
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(str(task.exception()))
+                if not pending and launched < len(nodes):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise XRPLUnavailableError("; ".join(errors))
+
+    async def probe(self):
+        """Ping every node once, updating latency and breakers"""
+        from xrpl.models.requests import Ping
+
+        async def check(node: XRPLNode):
+            try:
+                await self._call(node, Ping())
+            except XRPLUnavailableError:
+                pass
+
+        await asyncio.gather(*(check(node) for node in self.nodes))
+
+    def start_health_checks(self):
+        if self.health_interval > 0 and (self._health_task is None or self._health_task.done()):
+            self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.error(f"XRPL health probe failed: {str(e)}")
+
+    def retry_after(self) -> int:
+        """Whole seconds until the first open breaker lets calls through again"""
+        now = time.monotonic()
+        waits = [node.open_until - now for node in self.nodes if not node.available(now)]
+        return max(1, int(min(waits)) + 1) if len(waits) == len(self.nodes) else 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hedged_requests": self.hedges, "nodes": [node.stats() for node in self.nodes]}
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for node in self.nodes:
+            await node.client.aclose()
+
+class CollectionMatcher:
+    """Precompiled (issuer, taxon) -> collection lookup for tracked collections.
+
+    Collections with a taxon are keyed by ``(issuer, taxon)``; collections
+    without one match every NFT of their issuer. An exact taxon match wins
+    over an issuer-wide one.
+    """
+
+    def __init__(self, tracked_collections: Iterable[Dict[str, Any]] = ()):
+        self.exact: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.wildcard: Dict[str, Dict[str, Any]] = {}
+        for collection in tracked_collections:
+            issuer = collection.get("issuer", "")
+            taxon = collection.get("taxon")
+            if taxon is None:
+                self.wildcard.setdefault(issuer, collection)
             else:
+                self.exact.setdefault((issuer, taxon), collection)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> "CollectionMatcher":
+        return cls(
+            {"name": row.name, "issuer": row.issuer, "taxon": row.taxon}
+            for row in rows
+        )
+
+    def match(self, issuer: str, taxon: Optional[int]) -> Optional[Dict[str, Any]]:
+        collection = self.exact.get((issuer, taxon))
+        if collection is None:
+            collection = self.wildcard.get(issuer)
+        return collection
+
+    def __len__(self) -> int:
+        return len(self.exact) + len(self.wildcard)
+
+class XRPLService:
+    def __init__(self, urls: Iterable[str] = ()):
+        self.client = XRPLNodePool(urls)
+
+    async def iter_account_nft_pages(self, wallet_address: str, limit: int = XRPL_NFT_PAGE_LIMIT) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield the wallet's NFTs one ``account_nfts`` page at a time.
+
+        Follows ``marker`` until the last page, pinning every follow-up
+        request to the ledger of the first response so pages stay
+        consistent. Only one page is held in memory at a time. Raises
+        ``XRPLServiceError`` rather than ending early, so a failure never
+        reads as "no NFTs": ``XRPLRequestError`` for invalid addresses and
+        ``XRPLUnavailableError`` when no node answers.
+        """
+        from xrpl.models.requests import AccountNFTs
+
+        marker = None
+        ledger_index = "validated"
+        while True:
+            try:
+                request = AccountNFTs(
+                    account=wallet_address,
+                    limit=limit,
+                    marker=marker,
+                    ledger_index=ledger_index
+                )
+            except Exception as e:
+                raise XRPLRequestError(f"Invalid account_nfts request for {wallet_address}: {str(e)}")
+            try:
+                response = await self.client.request(request)
+            except XRPLUnavailableError as e:
+                logger.error(f"Error fetching NFTs for {wallet_address}: {str(e)}")
+                raise
+
+            if not response.is_successful():
+                error = response.result.get("error")
+                if error == "actNotFound":
+                    # Unfunded accounts genuinely hold nothing.
+                    return
+                if error in REQUEST_ERRORS:
+                    raise XRPLRequestError(f"account_nfts rejected {wallet_address}: {error}")
                 logger.error(f"Failed to fetch NFTs for {wallet_address}: {response}")
-                return []
-        except Exception as e:
-            logger.error(f"Error fetching NFTs for {wallet_address}: {str(e)}")
-            return []
-    
-    async def verify_nft_ownership(self, wallet_address: str, tracked_collections: List[Dict[str, Any]]) -> Dict[str, Any]:
-        nfts = await self.get_account_nfts(wallet_address)
-        
+                raise XRPLServiceError(f"account_nfts failed for {wallet_address}: {error}")
+
+            yield response.result.get("account_nfts", [])
+
+            marker = response.result.get("marker")
+            if marker is None:
+                return
+            ledger_index = response.result.get("ledger_index", ledger_index)
+
+    async def _result(self, request: "Request") -> Dict[str, Any]:
+        response = await self.client.request(request)
+        if not response.is_successful():
+            raise XRPLServiceError(f"{request.method.value} failed: {response.result.get('error')}")
+        return response.result
+
+    async def validated_ledger_index(self) -> int:
+        from xrpl.models.requests import Ledger
+
+        result = await self._result(Ledger(ledger_index="validated"))
+        return int(result["ledger_index"])
+
+    async def ledger_transactions(self, ledger_index: int) -> List[Dict[str, Any]]:
+        """Transactions of a validated ledger, each with its metadata"""
+        from xrpl.models.requests import Ledger
+
+        result = await self._result(Ledger(ledger_index=ledger_index, transactions=True, expand=True))
+        return result["ledger"].get("transactions", [])
+
+    async def iter_issuer_nfts(
+        self,
+        issuer: str,
+        taxon: Optional[int] = None,
+        ledger_index: Union[str, int] = "validated",
+        limit: int = XRPL_ISSUER_PAGE_LIMIT
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """Yield ``(ledger_index, nfts)`` pages of an issuer's NFTs.
+
+        Uses clio's ``nfts_by_issuer``, so at least one node in the pool must
+        be a clio server. Follow-up pages are pinned to the first page's ledger.
+        """
+        from xrpl.models.requests import NFTsByIssuer
+
+        marker = None
+        while True:
+            result = await self._result(NFTsByIssuer(
+                issuer=issuer, nft_taxon=taxon, marker=marker, limit=limit, ledger_index=ledger_index
+            ))
+            ledger_index = int(result.get("ledger_index", ledger_index))
+            yield ledger_index, result.get("nfts", [])
+            marker = result.get("marker")
+            if marker is None:
+                return
+
+    async def get_account_nfts(self, wallet_address: str) -> List[Dict[str, Any]]:
+        nfts = []
+        async for page in self.iter_account_nft_pages(wallet_address):
+            nfts.extend(page)
+        return nfts
+
+    async def verify_nft_ownership(
+        self,
+        wallet_address: str,
+        tracked_collections: Union[CollectionMatcher, List[Dict[str, Any]]],
+        stop_on_match: bool = False
+    ) -> Dict[str, Any]:
+        """Scan the wallet's NFTs page by page for tracked collections.
+
+        With ``stop_on_match`` the scan ends after the first page holding a
+        tracked NFT, so ``total_nfts`` only counts the pages scanned.
+        """
+        if isinstance(tracked_collections, CollectionMatcher):
+            matcher = tracked_collections
+        else:
+            matcher = CollectionMatcher(tracked_collections)
+
+        total_nfts = 0
         owned_nfts = []
-        for nft in nfts:
-            issuer = nft.get("Issuer", "")
-            taxon = nft.get("NFTokenTaxon")
-            
-            for collection in tracked_collections:
-                collection_issuer = collection.get("issuer", "")
-                collection_taxon = collection.get("taxon")
-                
-                if issuer == collection_issuer:
-                    if collection_taxon is None or taxon == collection_taxon:
+        async with aclosing(self.iter_account_nft_pages(wallet_address)) as pages:
+            async for page in pages:
+                total_nfts += len(page)
+                for nft in page:
+                    issuer = nft.get("Issuer", "")
+                    taxon = nft.get("NFTokenTaxon")
+
+                    collection = matcher.match(issuer, taxon)
+                    if collection is not None:
                         owned_nfts.append({
                             "nft_id": nft.get("NFTokenID"),
                             "issuer": issuer,
@@ -48,13 +476,19 @@ class XRPLService:
                             "collection_name": collection.get("name", "Unknown"),
                             "flags": nft.get("Flags", 0)
                         })
-                        break
-        
+
+                if stop_on_match and owned_nfts:
+                    break
+
         return {
             "wallet_address": wallet_address,
-            "total_nfts": len(nfts),
+            "total_nfts": total_nfts,
             "tracked_nfts": owned_nfts,
-            "has_tracked_nfts": len(owned_nfts) > 0
+            "has_tracked_nfts": len(owned_nfts) > 0,
+            "source": "ledger"
         }
 
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
 xrpl_service = XRPLService()
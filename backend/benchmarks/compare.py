@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare results/base.json results/new.json --threshold 0.15
+
+Exits with status 1 when any scenario's p99 grows, or its throughput drops,
+by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+def _scenarios(report: Dict[str, Any]) -> Iterator[Tuple[Tuple[int, str], Dict[str, Any]]]:
+    for run in report["runs"]:
+        for name, stats in run["scenarios"].items():
+            yield (run["rows"], name), stats
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old if old else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative slowdown (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = dict(_scenarios(json.load(f)))
+    with open(args.candidate) as f:
+        candidate = dict(_scenarios(json.load(f)))
+
+    regressions = 0
+    print(f"{'rows':>9}  {'scenario':<18} {'p50 ms':>17} {'p99 ms':>17} {'req/s':>17}")
+    for key in sorted(set(baseline) & set(candidate)):
+        old, new = baseline[key], candidate[key]
+        p99_change = _change(old["p99_ms"], new["p99_ms"])
+        rps_change = _change(old["rps"], new["rps"])
+        regressed = p99_change > args.threshold or rps_change < -args.threshold
+        regressions += regressed
+        rows, name = key
+        print(
+            f"{rows:>9}  {name:<18} "
+            f"{new['p50_ms']:>9.2f} ({_change(old['p50_ms'], new['p50_ms']):+5.0%}) "
+            f"{new['p99_ms']:>9.2f} ({p99_change:+5.0%}) "
+            f"{new['rps']:>9.1f} ({rps_change:+5.0%})"
+            + ("  REGRESSION" if regressed else "")
+        )
+    for key in sorted(set(baseline) ^ set(candidate)):
+        print(f"{key[0]:>9}  {key[1]:<18} only in {'baseline' if key in baseline else 'candidate'}")
+
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Synthetic whitelist datasets for benchmarks
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+from sqlalchemy import delete, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+COUNTRIES = ["US", "DE", "GB", "FR", "JP", "BR", "IN", "CA", "AU", "NG"]
+DOMAINS = ["gmail.com", "outlook.com", "proton.me", "yahoo.com", "example.org"]
+LOAD_BATCH_SIZE = 10000
+
+def wallet_address(i: int, prefix: str = "rBench") -> str:
+    """Deterministic address matching the API's ``^r[a-zA-Z0-9]{24,34}$`` pattern"""
+    return f"{prefix}{i:020d}"
+
+def entry_payload(i: int, prefix: str = "rBench") -> Dict[str, Any]:
+    """Body for ``POST /api/whitelist``"""
+    return {
+        "full_name": f"Bench User {i}",
+        "email": f"user{i}@{DOMAINS[i % len(DOMAINS)]}",
+        "wallet_address": wallet_address(i, prefix),
+        "street_address": f"{i} Benchmark Street",
+        "city": "Testville",
+        "state_province": "TS",
+        "zip_postal": f"{i % 100000:05d}",
+        "country": COUNTRIES[i % len(COUNTRIES)],
+        "phone_number": None,
+    }
+
+def iter_rows(count: int, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """Table rows for ``whitelist_entries``, one second apart"""
+    base = datetime(2024, 1, 1)
+    for i in range(start, start + count):
+        payload = entry_payload(i)
+        payload.update(
+            id=f"bench-{i:012d}",
+            email_domain=payload["email"].rpartition("@")[2],
+            created_at=base + timedelta(seconds=i),
+        )
+        yield payload
+
+def load_whitelist(engine: Engine, count: int, batch_size: int = LOAD_BATCH_SIZE) -> int:
+    """Replace the whitelist (with its change feed and stats) by ``count`` synthetic rows, batch by batch"""
+    from app.change_feed import log_inserts
+    from app.db_models import WhitelistChangeDB, WhitelistEntryDB
+    from app.whitelist_stats import reconcile
+    from app.whitelist_writes import record_whitelist_change
+
+    with engine.begin() as conn:
+        conn.execute(delete(WhitelistEntryDB))
+        conn.execute(delete(WhitelistChangeDB))
+    batch: List[Dict[str, Any]] = []
+    for row in iter_rows(count):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            with engine.begin() as conn:
+                conn.execute(insert(WhitelistEntryDB), batch)
+                log_inserts(conn, batch)
+            batch = []
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(WhitelistEntryDB), batch)
+            log_inserts(conn, batch)
+    # Exports are cached per whitelist version, so writes made here must bump it too;
+    # the dashboard stats are recounted from the loaded rows.
+    with Session(engine) as db:
+        record_whitelist_change(db)
+        db.commit()
+        reconcile(db)
+    return count
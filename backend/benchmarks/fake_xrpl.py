@@ -0,0 +1,210 @@
+"""
+Local stand-in for an XRPL JSON-RPC node, for benchmarks and load tests.
+
+Serves ``account_nfts`` with paging markers (and ``ping``), optional injected latency and
+a configurable share of failed calls. Holdings are derived from the wallet
+address, so every run sees the same NFTs.
+
+    python -m benchmarks.fake_xrpl --port 5005 --latency-ms 40 --error-rate 0.01
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_ISSUER = "rKhHA3suVVRtJpUQE5vZntyMTWvd9hBxg1"
+LEDGER_INDEX = 90000000
+
+class FakeXRPLNode:
+    """Threaded JSON-RPC server answering ``account_nfts``.
+
+    ``holder_ratio`` of wallets hold ``tracked_nfts`` NFTs of ``issuer``
+    (taxon 0); every wallet also holds ``other_nfts`` unrelated NFTs.
+    ``error_rate`` of requests fail with one of ``error_kinds``:
+    ``http`` (503), ``rpc`` (JSON-RPC ``tooBusy``) or ``drop`` (connection
+    closed without a response).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        issuer: str = DEFAULT_ISSUER,
+        holder_ratio: float = 0.5,
+        tracked_nfts: int = 3,
+        other_nfts: int = 20,
+        page_limit: int = 400,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_kinds: tuple = ("http", "rpc", "drop"),
+        seed: int = 0,
+    ):
+        self.issuer = issuer
+        self.holder_ratio = holder_ratio
+        self.tracked_nfts = tracked_nfts
+        self.other_nfts = other_nfts
+        self.page_limit = page_limit
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_kinds = error_kinds
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeXRPLNode":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeXRPLNode":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def is_holder(self, wallet: str) -> bool:
+        digest = hashlib.sha256(wallet.encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") / 2 ** 32 < self.holder_ratio
+
+    def nfts_for(self, wallet: str) -> List[Dict[str, Any]]:
+        tracked = self.tracked_nfts if self.is_holder(wallet) else 0
+        nfts = []
+        for serial in range(tracked + self.other_nfts):
+            mine = serial < tracked
+            token_id = hashlib.sha256(f"{wallet}:{serial}".encode("utf-8")).hexdigest().upper()
+            nfts.append({
+                "Flags": 8,
+                "Issuer": self.issuer if mine else "rPEPPER7kfTD9w2To4CQk6UCfuHM9c6GDY",
+                "NFTokenID": token_id,
+                "NFTokenTaxon": 0 if mine else 7,
+                "URI": "",
+                "nft_serial": serial,
+            })
+        # Spread the tracked NFTs over the pages like a real account.
+        random.Random(wallet).shuffle(nfts)
+        return nfts
+
+    def _pick_error(self) -> Optional[str]:
+        with self._lock:
+            self.requests += 1
+            if self.error_rate <= 0 or self._random.random() >= self.error_rate:
+                return None
+            self.errors += 1
+            return self._random.choice(self.error_kinds)
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self._lock:
+                jitter = self._random.uniform(0, self.jitter_ms)
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+    def account_nfts(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        account = params.get("account", "")
+        limit = min(int(params.get("limit") or self.page_limit), self.page_limit)
+        start = int(params["marker"]) if params.get("marker") else 0
+        nfts = self.nfts_for(account)
+        result = {
+            "account": account,
+            "account_nfts": nfts[start:start + limit],
+            "ledger_index": LEDGER_INDEX,
+            "limit": limit,
+            "status": "success",
+            "validated": True,
+        }
+        if start + limit < len(nfts):
+            result["marker"] = str(start + limit)
+        return result
+
+    def handle(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        method = body.get("method")
+        params = (body.get("params") or [{}])[0]
+        if method == "account_nfts":
+            return {"result": self.account_nfts(params)}
+        if method == "ping":
+            return {"result": {"status": "success"}}
+        return {"result": {"error": "unknownCmd", "status": "error", "request": body}}
+
+    def _handler_class(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                node._delay()
+                error = node._pick_error()
+                if error == "drop":
+                    self.close_connection = True
+                    return
+                if error == "http":
+                    self._send(503, b"Service Unavailable", "text/plain")
+                    return
+                if error == "rpc":
+                    payload = {"result": {"error": "tooBusy", "error_message": "The server is too busy to help you now.", "status": "error"}}
+                else:
+                    payload = node.handle(body)
+                self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+            def _send(self, status: int, content: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake XRPL JSON-RPC node")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--issuer", default=DEFAULT_ISSUER)
+    parser.add_argument("--holder-ratio", type=float, default=0.5)
+    parser.add_argument("--tracked-nfts", type=int, default=3)
+    parser.add_argument("--other-nfts", type=int, default=20)
+    parser.add_argument("--page-limit", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    node = FakeXRPLNode(
+        host=args.host, port=args.port, issuer=args.issuer,
+        holder_ratio=args.holder_ratio, tracked_nfts=args.tracked_nfts, other_nfts=args.other_nfts,
+        page_limit=args.page_limit, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+    print(f"Fake XRPL node listening on {node.url}")
+    node.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        node.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+End-to-end benchmark: a uvicorn server per dataset size, the fake XRPL node,
+and an async load generator. Results are written as JSON for
+``python -m benchmarks.compare``.
+
+    cd backend
+    python -m benchmarks.run --rows 1000 100000 --requests 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .datasets import entry_payload, load_whitelist, wallet_address
+from .fake_xrpl import DEFAULT_ISSUER, FakeXRPLNode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float, statuses: Dict[int, int]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "p50_ms": ms(percentile(ordered, 0.50)),
+        "p90_ms": ms(percentile(ordered, 0.90)),
+        "p99_ms": ms(percentile(ordered, 0.99)),
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_request: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int,
+    ok_statuses=(200,),
+) -> Dict[str, Any]:
+    """Issue ``requests`` calls with ``concurrency`` in flight and time each one"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                # Streamed downloads are timed to the last byte.
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status not in ok_statuses:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started, statuses)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class Server:
+    """The app under uvicorn in a child process"""
+
+    def __init__(self, env: Dict[str, str], workers: int = 1):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+
+    def wait_ready(self, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                if httpx.get(f"{self.url}/healthz", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("Server did not become ready")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+class Admin:
+    """Admin wallet used for the login scenario and authenticated endpoints"""
+
+    def __init__(self):
+        from xrpl import CryptoAlgorithm
+        from xrpl.core import keypairs
+        self._keypairs = keypairs
+        seed = keypairs.generate_seed(algorithm=CryptoAlgorithm.ED25519)
+        self.public_key, self.private_key = keypairs.derive_keypair(seed)
+        self.address = keypairs.derive_classic_address(self.public_key)
+
+    def sign(self, message: str) -> str:
+        return self._keypairs.sign(message.encode("utf-8"), self.private_key)
+
+    async def login(self, client: httpx.AsyncClient) -> httpx.Response:
+        challenge = (await client.post("/api/auth/challenge", json={"wallet_address": self.address})).json()
+        signature = await asyncio.to_thread(self.sign, challenge["message"])
+        return await client.post("/api/auth/verify", json={
+            "challenge_id": challenge["challenge_id"],
+            "wallet_address": self.address,
+            "signature": signature,
+            "public_key": self.public_key,
+        })
+
+async def benchmark_dataset(url: str, admin: Admin, rows: int, args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client:
+        token = (await admin.login(client)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        collections = (await client.get("/api/collections")).json()
+        if not any(c["issuer"] == DEFAULT_ISSUER for c in collections):
+            await client.post("/api/collections", json={"name": "Bench", "issuer": DEFAULT_ISSUER, "taxon": 0}, headers=headers)
+
+        sample = random.Random(rows)
+        verify_wallets = [wallet_address(sample.randrange(rows)) for _ in range(args.requests)] if rows else []
+        hot_wallet = wallet_address(0)
+        n, c = args.requests, args.concurrency
+
+        scenarios = {
+            "signup": (lambda cl, i: cl.post("/api/whitelist", json=entry_payload(rows + i, prefix="rSignup")), n, c),
+            "whitelist_page": (lambda cl, i: cl.get("/api/whitelist", params={"limit": 100}, headers=headers), n, c),
+            "whitelist_count": (lambda cl, i: cl.get("/api/whitelist/count", headers=headers), n, c),
+            "admin_stats": (lambda cl, i: cl.get("/api/admin/stats", headers=headers), n, c),
+            "changes_page": (lambda cl, i: cl.get("/api/admin/whitelist/changes", params={"limit": 1000}, headers=headers), n, c),
+            "collections": (lambda cl, i: cl.get("/api/collections"), n, c),
+            "verify": (lambda cl, i: cl.post("/api/nfts/verify", json={"wallet_address": verify_wallets[i]}), n if rows else 0, c),
+            "verify_cached": (lambda cl, i: cl.post("/api/nfts/verify", json={"wallet_address": hot_wallet}), n, c),
+            "login": (lambda cl, i: admin.login(cl), max(1, n // 5), min(c, 8)),
+            "export_json": (lambda cl, i: cl.get("/api/admin/download/json", headers=headers), args.export_requests, 1),
+            "export_addresses": (lambda cl, i: cl.get("/api/admin/download/addresses", headers=headers), args.export_requests, 1),
+            "export_csv": (lambda cl, i: cl.get("/api/admin/download/csv", headers=headers), args.export_requests, 1),
+        }
+        results = {}
+        for name, (make_request, requests, concurrency) in scenarios.items():
+            if args.scenarios and name not in args.scenarios or not requests:
+                continue
+            results[name] = await run_scenario(client, make_request, requests, concurrency)
+            print(f"  {name:<18} p50 {results[name]['p50_ms']:>9.2f} ms  p99 {results[name]['p99_ms']:>9.2f} ms  "
+                  f"{results[name]['rps']:>9.1f} req/s  errors {results[name]['errors']}")
+        return results
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against a fake XRPL node")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000], help="whitelist sizes to test (e.g. 1000 ... 1000000)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--export-requests", type=int, default=3)
+    parser.add_argument("--scenarios", nargs="*", help="only run these scenarios")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--xrpl-latency-ms", type=float, default=20)
+    parser.add_argument("--xrpl-jitter-ms", type=float, default=10)
+    parser.add_argument("--xrpl-error-rate", type=float, default=0.0)
+    parser.add_argument("--xrpl-nfts", type=int, default=20, help="unrelated NFTs per wallet")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="nft-bench-")
+    database_url = args.database_url or f"sqlite:///{workdir}/bench.db"
+    admin = Admin()
+    node = FakeXRPLNode(
+        latency_ms=args.xrpl_latency_ms, jitter_ms=args.xrpl_jitter_ms,
+        error_rate=args.xrpl_error_rate, other_nfts=args.xrpl_nfts,
+    ).start()
+
+    env = dict(os.environ)
+    env.update(DATABASE_URL=database_url, XRPL_CLIENT_URL=node.url, SUPER_ADMIN_WALLET=admin.address)
+    # The loader shares the server's database settings.
+    os.environ.update(DATABASE_URL=database_url, SUPER_ADMIN_WALLET=admin.address)
+    sys.path.insert(0, BACKEND_DIR)
+    from app.db_models import engine, init_db
+    init_db()
+
+    runs = []
+    try:
+        for rows in args.rows:
+            print(f"Dataset: {rows} rows")
+            started = time.perf_counter()
+            load_whitelist(engine, rows)
+            load_seconds = time.perf_counter() - started
+            server = Server(env, workers=args.workers)
+            try:
+                server.wait_ready()
+                scenarios = asyncio.run(benchmark_dataset(server.url, admin, rows, args))
+            finally:
+                server.stop()
+            runs.append({"rows": rows, "load_seconds": round(load_seconds, 2), "scenarios": scenarios})
+    finally:
+        node.stop()
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git": revision,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": database_url.split("://", 1)[0],
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "xrpl_node": {"requests": node.requests, "errors": node.errors},
+        },
+        "runs": runs,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(revision['commit'] or 'nogit')[:10]}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
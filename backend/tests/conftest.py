@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# The app reads its settings at import time: point it at a throwaway database.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+os.environ.setdefault("NFT_INDEXER_ENABLED", "false")
@@ -0,0 +1,76 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.admin_roles import ADMIN_WALLETS_VERSION_KEY
+from app.auth import create_access_token, decode_token, token_cache
+from app.db_models import AdminRole, AdminWalletDB, SessionLocal, get_cache_version, init_db
+from app.main import app
+from app.wallet_auth import add_admin_wallet, remove_admin_wallet
+
+ADMIN = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+PROTECTED = "/api/whitelist/count"
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(AdminWalletDB).filter(AdminWalletDB.wallet_address == ADMIN).delete()
+    session.commit()
+    yield session
+    session.query(AdminWalletDB).filter(AdminWalletDB.wallet_address == ADMIN).delete()
+    session.commit()
+    session.close()
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+def wallet_token(db, role: str = "admin", expires_delta: timedelta = timedelta(minutes=5)) -> str:
+    """A token as /api/auth/verify issues it, for the current admin-wallets version"""
+    version = get_cache_version(db, ADMIN_WALLETS_VERSION_KEY)
+    return create_access_token({"sub": ADMIN, "role": role, "av": version}, expires_delta=expires_delta)
+
+def get(client, token: str):
+    return client.get(PROTECTED, headers={"Authorization": f"Bearer {token}"})
+
+def test_token_revoked_when_wallet_removed(db, client):
+    add_admin_wallet(db, ADMIN, AdminRole.admin, "test")
+    token = wallet_token(db)
+    assert get(client, token).status_code == 200
+
+    remove_admin_wallet(db, ADMIN, "test")
+    response = get(client, token)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Admin wallet is no longer authorized"
+
+def test_current_version_trusts_role_claim(db, client):
+    # No admin_wallets row: only the claim vouches for the wallet.
+    token = wallet_token(db)
+    assert get(client, token).status_code == 200
+
+def test_stale_version_reads_role_from_database(db, client):
+    token = wallet_token(db)
+    add_admin_wallet(db, ADMIN, AdminRole.admin, "test")
+    assert get(client, token).status_code == 200
+    remove_admin_wallet(db, ADMIN, "test")
+    assert get(client, token).status_code == 401
+
+def test_token_cache_never_outlives_expiry(db):
+    token = wallet_token(db, expires_delta=timedelta(seconds=1))
+    claims = decode_token(token)
+    expires_at, _ = token_cache._data[token]
+    assert expires_at - time.monotonic() <= claims["exp"] - time.time() + 0.01
+
+    # exp has one-second resolution and jose accepts the whole of that second.
+    time.sleep(2.1)
+    with pytest.raises(HTTPException) as raised:
+        decode_token(token)
+    assert raised.value.status_code == 401
+
+def test_expired_token_rejected(db, client):
+    token = wallet_token(db, expires_delta=timedelta(seconds=-1))
+    assert get(client, token).status_code == 401
@@ -0,0 +1,76 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.challenge_store import Challenge, ChallengeStore, DBChallengeStore, MemoryChallengeStore
+from app.db_models import SessionLocal, init_db
+
+WALLET = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    init_db()
+
+def new_challenge(expires_in: float = 300) -> Challenge:
+    return Challenge(
+        id=str(uuid.uuid4()),
+        wallet_address=WALLET,
+        nonce=str(uuid.uuid4()),
+        message="Sign in",
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in),
+    )
+
+def consume_concurrently(store: ChallengeStore, challenge_id: str, attempts: int = 8):
+    """Consume one challenge from several threads at once, each with its own session"""
+    barrier = threading.Barrier(attempts)
+    results = [None] * attempts
+
+    def attempt(i: int):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            results[i] = store.consume(db, challenge_id, WALLET)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=attempt, args=(i,)) for i in range(attempts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+@pytest.mark.parametrize("store", [DBChallengeStore(), MemoryChallengeStore()], ids=["db", "memory"])
+def test_only_one_concurrent_consume_wins(store):
+    for _ in range(20):
+        challenge = new_challenge()
+        db = SessionLocal()
+        try:
+            store.save(db, challenge)
+        finally:
+            db.close()
+        winners = [result for result in consume_concurrently(store, challenge.id) if result is not None]
+        assert len(winners) == 1
+        assert winners[0].id == challenge.id
+
+@pytest.mark.parametrize("store", [DBChallengeStore(), MemoryChallengeStore()], ids=["db", "memory"])
+def test_consume_rejects_expired_and_wrong_wallet(store):
+    db = SessionLocal()
+    try:
+        expired = new_challenge(expires_in=-1)
+        store.save(db, expired)
+        assert store.consume(db, expired.id, WALLET) is None
+
+        challenge = new_challenge()
+        store.save(db, challenge)
+        assert store.consume(db, challenge.id, "r" + "1" * 25) is None
+        assert store.consume(db, challenge.id, WALLET) is not None
+        assert store.consume(db, challenge.id, WALLET) is None
+    finally:
+        db.close()
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ChallengeStore()
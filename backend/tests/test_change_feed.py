@@ -0,0 +1,33 @@
+import base64
+import json
+
+import pytest
+
+from app.change_feed import MAX_SEQ, decode_change_cursor, encode_change_cursor
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii").rstrip("=")
+
+@pytest.mark.parametrize("seq", [0, 1, 12345, MAX_SEQ])
+def test_round_trip(seq):
+    assert decode_change_cursor(encode_change_cursor(seq)) == seq
+
+@pytest.mark.parametrize("value", [
+    ["changes", True],
+    ["changes", False],
+    ["changes", -1],
+    ["changes", MAX_SEQ + 1],
+    ["changes", 10 ** 30],
+    ["changes", 1.5],
+    ["changes", "1"],
+    ["entries", 1],
+    ["changes"],
+    {"changes": 1},
+])
+def test_rejects_cursors_we_never_issue(value):
+    with pytest.raises(ValueError):
+        decode_change_cursor(raw_cursor(value))
+
+def test_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_change_cursor("not a cursor!")
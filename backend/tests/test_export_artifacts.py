@@ -0,0 +1,28 @@
+import fcntl
+import os
+
+import pytest
+
+from app.db_models import init_db
+from app.export_artifacts import BUILD_LOCK_NAME, EXPORT_DIR, _artifacts_ready, artifact_path, build_locked
+
+VERSION = 41
+
+@pytest.fixture(autouse=True)
+def database():
+    init_db()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+def test_build_skipped_while_another_process_builds():
+    with open(os.path.join(EXPORT_DIR, BUILD_LOCK_NAME), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            assert build_locked(VERSION) is False
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    assert not os.path.exists(artifact_path(VERSION, "json"))
+
+def test_each_version_built_once():
+    assert build_locked(VERSION) is True
+    assert _artifacts_ready(VERSION)
+    assert build_locked(VERSION) is False
@@ -0,0 +1,203 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app import nft_index
+from app.collections_cache import CollectionsSnapshot
+from app.db_models import NFTHoldingDB, NFTIndexStateDB, SessionLocal, init_db
+from app.nft_index import IndexReader, NFTIndexer, nft_changes
+from app.xrpl_service import CollectionMatcher
+
+ISSUER = "rJoxBSzpXhPtAuqFmqxQtGKjA13jUJWthE"
+HOLDER = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+BUYER = "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+ACCOUNT_IDS = {
+    ISSUER: "C35B55AA096BA6D87A6E6C965A6534150DC56E5E",
+    HOLDER: "B5F762798A53D543A014CAF8B297CFF8F2F937E8",
+    BUYER: "F667B0CA50CC7709A220B0561B85E53A48461FA8",
+}
+URI = "697066733A2F2F62616679626569676479727A74357366703775646D37687537367568377932366E6634646675796C71616266336F636C67747179353566627A6469"
+
+def token_id(sequence: int, taxon: int = 7) -> str:
+    """NFTokenID minted by ISSUER: transferable, no fee, scrambled taxon"""
+    scrambled = ((384160001 * sequence + 2459) % 2 ** 32) ^ taxon
+    return f"00080000{ACCOUNT_IDS[ISSUER]}{scrambled:08X}{sequence:08X}"
+
+def page_id(owner: str, last_token: str = None) -> str:
+    """An owner's page keyed by its highest token; the last page is all ones"""
+    low = last_token[40:] if last_token else "F" * 24
+    return ACCOUNT_IDS[owner] + low
+
+def tokens(*ids: str):
+    return [{"NFToken": {"NFTokenID": nft_id, "URI": URI}} for nft_id in ids]
+
+def account_root(account: str, **previous):
+    return {"ModifiedNode": {
+        "LedgerEntryType": "AccountRoot",
+        "LedgerIndex": "2B6AC232AA4C4BE41BF49D2459FA4A0347E1B543A4C92FCEE0821C0201E2E9A8",
+        "FinalFields": {"Account": account, "Flags": 0, "OwnerCount": 1},
+        "PreviousFields": previous,
+    }}
+
+T12, T13, T14 = token_id(12), token_id(13), token_id(14)
+
+# NFTokenMint: the issuer's first NFT creates its only page.
+MINT = {"AffectedNodes": [
+    account_root(ISSUER, MintedNFTokens=12),
+    {"CreatedNode": {
+        "LedgerEntryType": "NFTokenPage",
+        "LedgerIndex": page_id(ISSUER),
+        "NewFields": {"NFTokens": tokens(T12)},
+    }},
+], "TransactionIndex": 3, "TransactionResult": "tesSUCCESS"}
+
+# NFTokenAcceptOffer: the issuer's page empties and is deleted, the buyer's page gains it.
+ACCEPT_OFFER = {"AffectedNodes": [
+    account_root(HOLDER, Balance="100000000"),
+    account_root(ISSUER, Balance="20000000"),
+    {"DeletedNode": {
+        "LedgerEntryType": "NFTokenOffer",
+        "LedgerIndex": "AED1A9A6A4D7A9C1D31F3FC18E1A0A1A7BB6F3A05B8E6F2F9B0D6B6E2A3C4D5E",
+        "FinalFields": {"Amount": "1000000", "Flags": 1, "NFTokenID": T12, "Owner": ISSUER},
+    }},
+    {"DeletedNode": {
+        "LedgerEntryType": "NFTokenPage",
+        "LedgerIndex": page_id(ISSUER),
+        "FinalFields": {"Flags": 0},
+        "PreviousFields": {"NFTokens": tokens(T12)},
+    }},
+    {"ModifiedNode": {
+        "LedgerEntryType": "NFTokenPage",
+        "LedgerIndex": page_id(HOLDER),
+        "FinalFields": {"Flags": 0, "NFTokens": tokens(T12, T13)},
+        "PreviousFields": {"NFTokens": tokens(T13)},
+    }},
+], "TransactionIndex": 0, "TransactionResult": "tesSUCCESS"}
+
+# NFTokenBurn: the holder's page loses one of its two NFTs.
+BURN = {"AffectedNodes": [
+    account_root(ISSUER, BurnedNFTokens=4),
+    {"ModifiedNode": {
+        "LedgerEntryType": "NFTokenPage",
+        "LedgerIndex": page_id(HOLDER),
+        "FinalFields": {"Flags": 0, "NFTokens": tokens(T12)},
+        "PreviousFields": {"NFTokens": tokens(T12, T13)},
+    }},
+], "TransactionIndex": 1, "TransactionResult": "tesSUCCESS"}
+
+# NFTokenMint into a full page: the lower half moves to a new page.
+FULL_PAGE = [token_id(sequence) for sequence in range(100, 132)]
+SPLIT = {"AffectedNodes": [
+    account_root(ISSUER, MintedNFTokens=132),
+    {"CreatedNode": {
+        "LedgerEntryType": "NFTokenPage",
+        "LedgerIndex": page_id(ISSUER, FULL_PAGE[15]),
+        "NewFields": {"NFTokens": tokens(*FULL_PAGE[:16]), "NextPageMin": page_id(ISSUER)},
+    }},
+    {"ModifiedNode": {
+        "LedgerEntryType": "NFTokenPage",
+        "LedgerIndex": page_id(ISSUER),
+        "FinalFields": {
+            "Flags": 0,
+            "NFTokens": tokens(*FULL_PAGE[16:], T14),
+            "PreviousPageMin": page_id(ISSUER, FULL_PAGE[15]),
+        },
+        "PreviousFields": {"NFTokens": tokens(*FULL_PAGE)},
+    }},
+], "TransactionIndex": 2, "TransactionResult": "tesSUCCESS"}
+
+def transfer(nft_id: str, seller: str, buyer: str, transaction_index: int):
+    """NFTokenAcceptOffer moving the seller's only NFT to a buyer without one"""
+    return {"AffectedNodes": [
+        {"DeletedNode": {
+            "LedgerEntryType": "NFTokenPage",
+            "LedgerIndex": page_id(seller),
+            "FinalFields": {"Flags": 0},
+            "PreviousFields": {"NFTokens": tokens(nft_id)},
+        }},
+        {"CreatedNode": {
+            "LedgerEntryType": "NFTokenPage",
+            "LedgerIndex": page_id(buyer),
+            "NewFields": {"NFTokens": tokens(nft_id)},
+        }},
+    ], "TransactionIndex": transaction_index, "TransactionResult": "tesSUCCESS"}
+
+def test_mint_creates_page():
+    assert nft_changes(MINT) == ({T12: (ISSUER, URI)}, set())
+
+def test_accept_offer_moves_token_to_buyer():
+    added, burned = nft_changes(ACCEPT_OFFER)
+    assert added == {T12: (HOLDER, URI)}
+    assert burned == set()
+
+def test_burn_removes_token():
+    assert nft_changes(BURN) == ({}, {T13})
+
+def test_page_split_keeps_owner():
+    added, burned = nft_changes(SPLIT)
+    assert burned == set()
+    assert added[T14] == (ISSUER, URI)
+    assert {owner for owner, _ in added.values()} == {ISSUER}
+
+def test_unrelated_nodes_are_ignored():
+    assert nft_changes({"AffectedNodes": [account_root(HOLDER, Balance="1")]}) == ({}, set())
+
+@pytest.fixture
+def no_index_state():
+    init_db()
+    db = SessionLocal()
+    db.query(NFTIndexStateDB).delete()
+    db.commit()
+    yield db
+    db.query(NFTIndexStateDB).delete()
+    db.commit()
+    db.close()
+
+def test_index_reader_skips_lookups_without_index(no_index_state, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(nft_index, "lookup", lambda wallet, collections: lookups.append(wallet) or {})
+    reader = IndexReader(enabled=False, check_interval=3600)
+
+    assert asyncio.run(reader.verify(HOLDER, None)) is None
+    no_index_state.add(NFTIndexStateDB(
+        name=nft_index.INDEX_STATE_KEY, ledger_index=1, collections_version=1, synced_at=datetime.utcnow()
+    ))
+    no_index_state.commit()
+    # Not looked for again until the check interval has passed.
+    assert asyncio.run(reader.verify(HOLDER, None)) is None
+    assert lookups == []
+
+    reader.check_interval = 0
+    assert asyncio.run(reader.verify(HOLDER, None)) == {}
+    assert lookups == [HOLDER]
+
+class LedgerService:
+    """Serves one ledger's transactions in the order given, like ``ledger`` does by hash"""
+
+    def __init__(self, *metas):
+        self.metas = metas
+
+    async def ledger_transactions(self, ledger_index: int):
+        return [{"hash": f"{i:064X}", "meta": meta} for i, meta in enumerate(self.metas)]
+
+@pytest.fixture
+def holdings():
+    init_db()
+    db = SessionLocal()
+    yield db
+    db.query(NFTHoldingDB).delete()
+    db.query(NFTIndexStateDB).delete()
+    db.commit()
+    db.close()
+
+def test_ledger_applied_in_transaction_order(holdings):
+    # ISSUER -> HOLDER at index 0, HOLDER -> BUYER at index 1, listed the other way round.
+    service = LedgerService(transfer(T12, HOLDER, BUYER, 1), transfer(T12, ISSUER, HOLDER, 0))
+    collections = CollectionsSnapshot(
+        version=1, collections=[], matcher=CollectionMatcher([{"name": "Test", "issuer": ISSUER, "taxon": 7}]),
+        body=b"[]", etag='"1"'
+    )
+    asyncio.run(NFTIndexer(service=service, interval=0).apply_ledger(100, collections))
+    holding = holdings.get(NFTHoldingDB, T12)
+    assert (holding.owner, holding.ledger_index) == (BUYER, 100)
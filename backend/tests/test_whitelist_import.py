@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+
+from app import whitelist_import
+from app.db_models import init_db
+from app.models import WhitelistCreate
+from app.whitelist_import import ImportDecodeError, _fast_email, _iter_lines, _validate_batch, import_request_body
+
+EMAILS = [
+    "user@example.com",
+    "User@Example.COM",
+    "USER+tag@Gmail.com",
+    "a.b-c_d@sub.example.co.uk",
+    "first.last@EXAMPLE.org",
+    "Postmaster@Example.com",
+    "ABUSE@example.com",
+    "x@bücher.de",
+    "ü@example.com",
+    "x@xn--bcher-kva.de",
+    "a" * 64 + "@example.com",
+    "a" * 65 + "@example.com",
+    "x@" + "a" * 63 + ".com",
+    "x@" + "a" * 64 + ".com",
+    "x..y@example.com",
+    ".x@example.com",
+    "x.@example.com",
+    "x@example..com",
+    "x@-example.com",
+    "x@example-.com",
+    "x@example",
+    "x@localhost",
+    "x@example.com.",
+    "x @example.com",
+    "x@example.com ",
+    "x@[192.168.0.1]",
+    "x@123.123.123.123",
+    "x@example.c",
+    "x@example.123",
+    "x@sub_domain.example.com",
+    "x@@example.com",
+    "@example.com",
+    "x@",
+    "",
+]
+
+def entry(email):
+    return {
+        "full_name": "A",
+        "email": email,
+        "wallet_address": "r" + "1" * 25,
+        "street_address": "s",
+        "city": "c",
+        "state_province": "p",
+        "zip_postal": "z",
+        "country": "US",
+    }
+
+def reference(email):
+    """The email as WhitelistCreate stores it, or None when it is rejected"""
+    try:
+        return WhitelistCreate(**entry(email)).email
+    except ValidationError:
+        return None
+
+@pytest.mark.parametrize("email", EMAILS)
+def test_fast_email_matches_whitelist_create(email):
+    fast = _fast_email(email)
+    # None only means "use the full validator"; anything else must be what it produces.
+    if fast is not None:
+        assert fast == reference(email)
+
+@pytest.mark.parametrize("email", EMAILS)
+def test_validate_batch_matches_whitelist_create(email):
+    valid, errors = _validate_batch([entry(email)])
+    expected = reference(email)
+    if expected is None:
+        assert 0 in errors and 0 not in valid
+    else:
+        assert valid[0].email == expected and not errors
+
+def test_validate_batch_keeps_rows_apart():
+    records = [entry(email) for email in EMAILS]
+    valid, errors = _validate_batch(records)
+    for i, email in enumerate(EMAILS):
+        expected = reference(email)
+        if expected is None:
+            assert i in errors
+        else:
+            assert valid[i].email == expected
+
+def test_iter_lines_reports_invalid_utf8_offset():
+    with pytest.raises(ImportDecodeError) as excinfo:
+        list(_iter_lines([b'{"a": 1}\n', b'{"b": "\xff"}\n']))
+    assert excinfo.value.offset == 16
+
+def test_iter_lines_decodes_split_characters():
+    text = '{"name": "Zoë"}\n'.encode("utf-8")
+    split = text.index(b"\xc3") + 1
+    assert list(_iter_lines([text[:split], text[split:]])) == ['{"name": "Zoë"}\n']
+
+class DisconnectingRequest:
+    """Sends ``chunks``, then behaves like a client that went away"""
+
+    def __init__(self, *chunks: bytes):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+        raise ClientDisconnect()
+
+def test_disconnect_mid_body_stops_importer(monkeypatch):
+    init_db()
+    monkeypatch.setattr(whitelist_import, "IMPORT_ABORT_POLL", 0.01)
+    body = DisconnectingRequest(b"full_name,email,wallet_address,street_address,city,state_province,zip_postal,country\n")
+
+    async def run():
+        return await asyncio.wait_for(import_request_body(body, "csv"), timeout=5)
+
+    report = asyncio.run(run())
+    assert report["inserted"] == 0
+    assert report["error"] == "Upload ended before the body was complete"
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth import verify_token
+from app.db_models import SessionLocal, WhitelistEntryDB, init_db
+from app.main import app
+from app.whitelist_query import (
+    ENTRY_COLUMNS, _prefix_upper_bound, after_cursor, decode_cursor, encode_cursor, filter_entries
+)
+
+CREATED_AT = datetime(2026, 1, 2, 3, 4, 5)
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(WhitelistEntryDB).delete()
+    # Five entries share one timestamp, so only the id orders them.
+    for i in range(7):
+        session.add(WhitelistEntryDB(
+            id=f"entry-{i}",
+            full_name=f"Entry {i}",
+            email=f"user{i}@example.com",
+            email_domain="example.com",
+            wallet_address=f"rWallet{i:027d}",
+            street_address="1 Main St",
+            city="Springfield",
+            state_province="IL",
+            zip_postal="62701",
+            country="United States",
+            created_at=CREATED_AT if i < 5 else CREATED_AT - timedelta(days=i),
+        ))
+    session.commit()
+    yield session
+    session.query(WhitelistEntryDB).delete()
+    session.commit()
+    session.close()
+
+def newest_first(query):
+    return query.order_by(WhitelistEntryDB.created_at.desc(), WhitelistEntryDB.id.desc())
+
+def test_pages_through_shared_timestamps(db):
+    expected = [row.id for row in newest_first(db.query(*ENTRY_COLUMNS)).all()]
+    seen, cursor = [], None
+    while True:
+        query = db.query(*ENTRY_COLUMNS)
+        if cursor:
+            query = after_cursor(query, cursor)
+        page = newest_first(query).limit(2).all()
+        if not page:
+            break
+        seen += [row.id for row in page]
+        cursor = encode_cursor(page[-1])
+    assert seen == expected
+    assert len(set(seen)) == 7
+
+def test_cursor_round_trip(db):
+    entry = db.get(WhitelistEntryDB, "entry-3")
+    assert decode_cursor(encode_cursor(entry)) == (CREATED_AT, "entry-3")
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor!", "WyJ4Il0", "WzEsMiwzXQ"])
+def test_decode_rejects_foreign_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_prefix_upper_bound():
+    assert _prefix_upper_bound("rAb") == "rAc"
+    assert _prefix_upper_bound("r") == "s"
+    assert _prefix_upper_bound("rz") == "r{"
+
+def test_wallet_prefix_filter(db):
+    wallet = f"rWallet{3:027d}"
+    rows = filter_entries(db.query(*ENTRY_COLUMNS), wallet_prefix=wallet).all()
+    assert [row.wallet_address for row in rows] == [wallet]
+    assert filter_entries(db.query(*ENTRY_COLUMNS), wallet_prefix="rWallet").count() == 7
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[verify_token] = lambda: "admin"
+    yield TestClient(app)
+    app.dependency_overrides.pop(verify_token)
+
+def test_bad_cursor_is_400(db, client):
+    response = client.get("/api/whitelist", params={"cursor": "not a cursor!"})
+    assert response.status_code == 400
+
+def test_listing_follows_next_cursor(db, client):
+    response = client.get("/api/whitelist", params={"limit": 4})
+    first = [entry["id"] for entry in response.json()]
+    response = client.get("/api/whitelist", params={"limit": 4, "cursor": response.headers["x-next-cursor"]})
+    assert "x-next-cursor" not in response.headers
+    assert first + [entry["id"] for entry in response.json()] == [f"entry-{i}" for i in (4, 3, 2, 1, 0, 5, 6)]
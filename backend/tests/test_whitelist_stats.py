@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from app.db_models import SessionLocal, WhitelistEntryDB, WhitelistStatDB, init_db
+from app.main import _clear_whitelist
+from app.models import WhitelistCreate
+from app.whitelist_import import import_entries
+from app.whitelist_stats import StatsReconciler, read_count, reconcile, reset_stats
+from app.whitelist_writes import build_entry_row, insert_entries, insert_entry
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(WhitelistEntryDB).delete()
+    reset_stats(session)
+    session.commit()
+    yield session
+    session.query(WhitelistEntryDB).delete()
+    session.query(WhitelistStatDB).delete()
+    session.commit()
+    session.close()
+
+def signup(i: int, country: str = "United States") -> dict:
+    return {
+        "full_name": f"Signup {i}",
+        "email": f"signup{i}@example.com",
+        "wallet_address": f"rStats{i:028d}",
+        "street_address": "1 Main St",
+        "city": "Springfield",
+        "state_province": "IL",
+        "zip_postal": "62701",
+        "country": country,
+    }
+
+def new_row(i: int, country: str = "United States"):
+    return build_entry_row(WhitelistCreate(**signup(i, country)))
+
+def stat_rows(db):
+    db.expire_all()
+    return sorted(db.query(WhitelistStatDB.dimension, WhitelistStatDB.key, WhitelistStatDB.count).all())
+
+def assert_reconciled(db):
+    """The incrementally maintained stats are exactly what a full recount produces"""
+    counted = stat_rows(db)
+    reconcile(db)
+    assert stat_rows(db) == counted
+
+def test_inserts_agree_with_recount(db):
+    insert_entry(db, new_row(0))
+    insert_entry(db, new_row(1, "Canada"))
+    outcomes = insert_entries(db, [new_row(2), new_row(1, "Canada"), new_row(3, "Canada")])
+    assert [outcome and outcome.status_code for outcome in outcomes] == [None, 409, None]
+    assert (read_count(db), read_count(db, "Canada"), read_count(db, "France")) == (4, 2, 0)
+    assert_reconciled(db)
+
+def test_import_agrees_with_recount(db):
+    insert_entry(db, new_row(0))
+    body = "\n".join(json.dumps(signup(i, "Canada" if i % 2 else "France")) for i in range(5))
+    report = import_entries(db, [body.encode("utf-8")], "ndjson", batch_size=2)
+    assert report["inserted"] == 4
+    assert read_count(db) == 5
+    assert_reconciled(db)
+
+def test_clear_agrees_with_recount(db):
+    insert_entries(db, [new_row(i) for i in range(3)])
+    assert _clear_whitelist(db) == 3
+    assert stat_rows(db) == [("total", "", 0)]
+    assert_reconciled(db)
+
+    insert_entry(db, new_row(4, "Canada"))
+    assert (read_count(db), read_count(db, "United States")) == (1, 0)
+    assert_reconciled(db)
+
+def test_missing_stats_filled_once_by_the_lock_holder(db, tmp_path):
+    insert_entries(db, [new_row(i) for i in range(3)])
+    db.query(WhitelistStatDB).delete()
+    db.commit()
+    lock_path = str(tmp_path / "stats.lock")
+    first, second = StatsReconciler(interval=3600, lock_path=lock_path), StatsReconciler(interval=3600, lock_path=lock_path)
+
+    async def run():
+        first.start()
+        second.start()
+        await asyncio.sleep(0.2)
+        leaders = [first.leader, second.leader]
+        await first.aclose()
+        # The lock is free again for the next worker to take over.
+        taken_over = second._acquire_lock()
+        await second.aclose()
+        return leaders, taken_over
+
+    leaders, taken_over = asyncio.run(run())
+    assert leaders == [True, False]
+    assert taken_over and not second.leader
+    assert (first.runs, second.runs) == (1, 0)
+    assert read_count(db) == 3
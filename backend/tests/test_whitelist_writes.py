@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+
+from app import whitelist_writes
+from app.db_models import SessionLocal, WhitelistEntryDB, init_db
+from app.main import app
+from app.models import WhitelistCreate
+from app.wallet_index import wallet_index
+from app.whitelist_writes import WhitelistWriteBatcher, build_entry_row, insert_entries, insert_entry
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.query(WhitelistEntryDB).delete()
+    session.commit()
+    session.close()
+
+SIGNUP = dict(
+    full_name="Ada Lovelace",
+    email="ada@example.com",
+    street_address="1 Main St",
+    city="London",
+    state_province="London",
+    zip_postal="N1",
+    country="United Kingdom",
+    phone_number="+44 20 7946 0000",
+)
+
+def new_row(wallet: str):
+    return build_entry_row(WhitelistCreate(**SIGNUP, wallet_address=wallet))
+
+WALLET = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+
+def test_duplicate_wallet_is_409(db):
+    insert_entry(db, new_row(WALLET))
+    with pytest.raises(HTTPException) as raised:
+        insert_entry(db, new_row(WALLET))
+    assert raised.value.status_code == 409
+
+def test_other_integrity_errors_are_500(db, monkeypatch):
+    def fail(session, inserted=()):
+        raise IntegrityError("INSERT INTO whitelist_stats", {}, Exception("constraint failed"))
+    monkeypatch.setattr(whitelist_writes, "record_whitelist_change", fail)
+
+    with pytest.raises(HTTPException) as raised:
+        insert_entry(db, new_row(WALLET))
+    assert raised.value.status_code == 500
+    outcomes = insert_entries(db, [new_row(WALLET)])
+    assert outcomes[0].status_code == 500
+    assert db.query(WhitelistEntryDB).count() == 0
+
+def wallet(i: int) -> str:
+    return f"rBatch{i:028d}"
+
+def stored_wallets(db):
+    db.expire_all()
+    return {address for (address,) in db.query(WhitelistEntryDB.wallet_address)}
+
+def test_batch_maps_duplicates_to_409(db):
+    insert_entry(db, new_row(wallet(0)))
+    outcomes = insert_entries(db, [new_row(wallet(0)), new_row(wallet(1)), new_row(wallet(1)), new_row(wallet(2))])
+    assert [outcome and outcome.status_code for outcome in outcomes] == [409, None, 409, None]
+    assert stored_wallets(db) == {wallet(0), wallet(1), wallet(2)}
+
+def test_batch_retried_row_by_row_after_integrity_error(db, monkeypatch):
+    calls = []
+    record = whitelist_writes.record_whitelist_change
+
+    def fail_once(session, inserted=()):
+        inserted = list(inserted)
+        calls.append(len(inserted))
+        if len(calls) == 1:
+            raise IntegrityError("INSERT INTO whitelist_entries", {}, Exception("UNIQUE constraint failed"))
+        record(session, inserted)
+    monkeypatch.setattr(whitelist_writes, "record_whitelist_change", fail_once)
+
+    outcomes = insert_entries(db, [new_row(wallet(i)) for i in range(3)])
+    assert outcomes == [None, None, None]
+    assert calls == [3, 1, 1, 1]
+    assert stored_wallets(db) == {wallet(i) for i in range(3)}
+
+async def submit_all(batcher: WhitelistWriteBatcher, rows, delay: float = 0):
+    async def submit(i, row):
+        await asyncio.sleep(delay * i)
+        await batcher.submit(row)
+    try:
+        return await asyncio.gather(*(submit(i, row) for i, row in enumerate(rows)), return_exceptions=True)
+    finally:
+        await batcher.aclose()
+
+def test_batcher_groups_signups_within_window(db):
+    batcher = WhitelistWriteBatcher(window_ms=200)
+    rows = [new_row(wallet(i)) for i in range(10)] + [new_row(wallet(3))]
+    outcomes = asyncio.run(submit_all(batcher, rows))
+    assert outcomes[:10] == [None] * 10
+    assert isinstance(outcomes[10], HTTPException) and outcomes[10].status_code == 409
+    assert (batcher.batches, batcher.rows) == (1, 11)
+    assert stored_wallets(db) == {wallet(i) for i in range(10)}
+
+def test_batcher_cuts_batches_at_max_batch(db):
+    batcher = WhitelistWriteBatcher(window_ms=200, max_batch=4)
+    outcomes = asyncio.run(submit_all(batcher, [new_row(wallet(i)) for i in range(10)]))
+    assert outcomes == [None] * 10
+    assert batcher.batches == 3
+
+def test_batcher_closes_window_on_time(db):
+    batcher = WhitelistWriteBatcher(window_ms=10)
+    outcomes = asyncio.run(submit_all(batcher, [new_row(wallet(i)) for i in range(2)], delay=0.3))
+    assert outcomes == [None, None]
+    assert batcher.batches == 2
+
+@pytest.fixture
+def client():
+    yield TestClient(app)
+    wallet_index.clear()
+
+def test_signup_conflicts_with_stored_wallet(db, client):
+    assert client.post("/api/whitelist", json={**SIGNUP, "wallet_address": WALLET}).status_code == 200
+    response = client.post("/api/whitelist", json={**SIGNUP, "wallet_address": WALLET})
+    assert response.status_code == 409
+
+def test_signup_after_clear_elsewhere_succeeds(db, client):
+    # Another worker cleared the whitelist; this worker's index still lists the wallet.
+    wallet_index.add([WALLET])
+    response = client.post("/api/whitelist", json={**SIGNUP, "wallet_address": WALLET})
+    assert response.status_code == 200
+    assert stored_wallets(db) == {WALLET}
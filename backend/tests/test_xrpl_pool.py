@@ -0,0 +1,165 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.xrpl_service import (
+    XRPLNodePool, XRPLRequestError, XRPLService, XRPLServiceError, XRPLUnavailableError
+)
+from benchmarks.fake_xrpl import FakeXRPLNode
+
+WALLET = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+
+def dead_url() -> str:
+    """A local port nobody listens on, refusing connections at once"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+class RejectingNode(FakeXRPLNode):
+    """Answers ``account_nfts`` with a fixed rippled error"""
+
+    def __init__(self, error: str, **options):
+        super().__init__(**options)
+        self.error = error
+
+    def account_nfts(self, params):
+        return {"error": self.error, "status": "error", "request": params}
+
+@pytest.fixture
+def nodes():
+    started = []
+
+    def start(node_class=FakeXRPLNode, **options) -> FakeXRPLNode:
+        node = node_class(**options).start()
+        started.append(node)
+        return node
+
+    yield start
+    for node in started:
+        node.stop()
+
+def pool_for(*urls: str, **options) -> XRPLNodePool:
+    options.setdefault("health_interval", 0)
+    return XRPLNodePool(urls, **options)
+
+async def ping(pool: XRPLNodePool):
+    from xrpl.models.requests import Ping
+    try:
+        return await pool.request(Ping())
+    finally:
+        await pool.aclose()
+
+def scan(service: XRPLService):
+    async def run():
+        try:
+            return [page async for page in service.iter_account_nft_pages(WALLET)]
+        finally:
+            await service.client.aclose()
+    return asyncio.run(run())
+
+def test_fails_over_to_next_node(nodes):
+    good = nodes()
+    pool = pool_for(dead_url(), good.url, hedge_delay_ms=0)
+    assert asyncio.run(ping(pool)).is_successful()
+    dead, healthy = pool.nodes
+    assert (dead.failures, dead.latency) == (1, None)
+    assert healthy.latency is not None
+
+def test_failed_unmeasured_node_ranked_last(nodes):
+    slow, good = nodes(latency_ms=400), nodes()
+    pool = pool_for(slow.url, dead_url(), good.url, hedge_delay_ms=100)
+    slow_node, dead_node, good_node = pool.nodes
+    dead_node.failures = 1
+    slow_node.latency = 0.4
+    assert pool._ranked() == [good_node, slow_node, dead_node]
+
+    good_node.latency = 0.01
+    assert pool._ranked() == [good_node, slow_node, dead_node]
+
+def test_dead_node_not_tried_first_again(nodes):
+    slow, good = nodes(latency_ms=400), nodes()
+    pool = pool_for(slow.url, dead_url(), good.url, hedge_delay_ms=100, retries=2)
+    from xrpl.models.requests import Ping
+
+    async def run():
+        try:
+            await pool.request(Ping())
+            good_requests = good.requests
+            started = time.perf_counter()
+            await pool.request(Ping())
+            return time.perf_counter() - started, good.requests - good_requests
+        finally:
+            await pool.aclose()
+
+    elapsed, good_calls = asyncio.run(run())
+    assert pool._ranked()[-1] is pool.nodes[1]
+    assert good_calls == 1
+    assert elapsed < 0.3
+
+def test_slow_call_hedged_on_next_node(nodes):
+    slow, fast = nodes(latency_ms=1000), nodes()
+    pool = pool_for(slow.url, fast.url, hedge_delay_ms=50)
+    pool.nodes[0].latency = 0.001
+    started = time.perf_counter()
+    assert asyncio.run(ping(pool)).is_successful()
+    assert time.perf_counter() - started < 0.5
+    assert pool.hedges == 1
+    # The cancelled call still counts against the slow node.
+    assert pool.nodes[0].latency > 0.001
+
+def test_breaker_opens_and_reports_retry_after(nodes):
+    pool = pool_for(dead_url(), dead_url(), hedge_delay_ms=0)
+    for node in pool.nodes:
+        for _ in range(5):
+            node.record_failure(threshold=5, cooldown=30)
+    assert pool._ranked() == []
+    assert 29 <= pool.retry_after() <= 31
+    with pytest.raises(XRPLUnavailableError, match="All XRPL nodes are unavailable"):
+        asyncio.run(ping(pool))
+
+def test_half_open_breaker_closes_on_success(nodes):
+    good = nodes()
+    pool = pool_for(good.url, hedge_delay_ms=0)
+    node = pool.nodes[0]
+    for _ in range(5):
+        node.record_failure(threshold=5, cooldown=0)
+    assert node.open_until > 0
+    assert pool.retry_after() == 1
+    assert asyncio.run(ping(pool)).is_successful()
+    assert (node.failures, node.open_until) == (0, 0.0)
+
+def test_node_errors_fail_over(nodes):
+    busy = nodes(error_rate=1.0, error_kinds=("rpc",))
+    good = nodes()
+    service = XRPLService()
+    service.client = pool_for(busy.url, good.url, hedge_delay_ms=0)
+    assert scan(service)
+    assert service.client.nodes[0].failures == 1
+
+def test_node_errors_everywhere_are_unavailable(nodes):
+    busy = nodes(error_rate=1.0, error_kinds=("rpc",))
+    service = XRPLService()
+    service.client = pool_for(busy.url, hedge_delay_ms=0)
+    with pytest.raises(XRPLUnavailableError):
+        scan(service)
+
+@pytest.mark.parametrize("error", ["actMalformed", "invalidParams"])
+def test_request_errors_not_retried(nodes, error):
+    rejecting, good = nodes(RejectingNode, error=error), nodes()
+    service = XRPLService()
+    service.client = pool_for(rejecting.url, good.url, hedge_delay_ms=0)
+    with pytest.raises(XRPLRequestError):
+        scan(service)
+    assert good.requests == 0
+    assert service.client.nodes[0].failures == 0
+
+def test_other_rpc_errors_are_service_errors(nodes):
+    rejecting = nodes(RejectingNode, error="lgrIdxsInvalid")
+    service = XRPLService()
+    service.client = pool_for(rejecting.url, hedge_delay_ms=0)
+    with pytest.raises(XRPLServiceError) as raised:
+        scan(service)
+    assert not isinstance(raised.value, (XRPLRequestError, XRPLUnavailableError))
@@ -9,7 +9,19 @@ import {
   Download, LogOut, Plus, Trash2, Users, Package, 
   CheckCircle, AlertCircle, Loader2, Search, Shield 
 } from 'lucide-react';
-import { apiService, WhitelistEntry, NFTCollection, NFTCollectionCreate, AdminWallet, AddAdminRequest } from '../services/api';
+import { apiService, WhitelistEntry, WhitelistFilters, NFTCollection, NFTCollectionCreate, AdminWallet, AddAdminRequest, AdminStats } from '../services/api';
+
+const WHITELIST_PAGE_SIZE = 100;
+const SEARCH_DELAY_MS = 300;
+
+// The listing filters by exact email domain, wallet prefix or exact country.
+function searchFilters(term: string): WhitelistFilters {
+  const value = term.trim();
+  if (!value) return {};
+  if (value.includes('@')) return { email_domain: value.slice(value.lastIndexOf('@') + 1) };
+  if (/^r[1-9A-HJ-NP-Za-km-z]*$/.test(value)) return { wallet_prefix: value };
+  return { country: value };
+}
 
 function decodeJWT(token: string): any {
   try {
@@ -28,11 +40,16 @@ export default function AdminDashboard() {
   const navigate = useNavigate();
   const [activeTab, setActiveTab] = useState<'whitelist' | 'collections' | 'admins'>('whitelist');
   const [whitelistEntries, setWhitelistEntries] = useState<WhitelistEntry[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [nftCollections, setNftCollections] = useState<NFTCollection[]>([]);
   const [adminWallets, setAdminWallets] = useState<AdminWallet[]>([]);
+  const [stats, setStats] = useState<AdminStats | null>(null);
   const [loading, setLoading] = useState(true);
   const [message, setMessage] = useState<{ type: 'success' | 'error'; text: string } | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [filters, setFilters] = useState<WhitelistFilters>({});
+  const [filteredTotal, setFilteredTotal] = useState<number | null>(null);
   const [showAddCollection, setShowAddCollection] = useState(false);
   const [showAddAdmin, setShowAddAdmin] = useState(false);
   const [newCollection, setNewCollection] = useState<NFTCollectionCreate>({
@@ -61,14 +78,31 @@ export default function AdminDashboard() {
     }
 
     loadData();
-  }, [activeTab, navigate]);
+  }, [activeTab, filters, navigate]);
+
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      const next = searchFilters(searchTerm);
+      // Keep the same object when nothing changed so the list is not reloaded.
+      setFilters((current) => (JSON.stringify(current) === JSON.stringify(next) ? current : next));
+    }, SEARCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
   const loadData = async () => {
     setLoading(true);
     try {
       if (activeTab === 'whitelist') {
-        const response = await apiService.getWhitelistEntries();
+        const filtered = Object.keys(filters).length > 0;
+        const [response, statsResponse, countResponse] = await Promise.all([
+          apiService.getWhitelistEntries({ ...filters, limit: WHITELIST_PAGE_SIZE }),
+          apiService.getAdminStats(),
+          filtered ? apiService.getWhitelistCount(filters) : Promise.resolve(null),
+        ]);
         setWhitelistEntries(response.data);
+        setNextCursor(response.headers['x-next-cursor'] || null);
+        setStats(statsResponse.data);
+        setFilteredTotal(countResponse ? countResponse.data.count : null);
       } else if (activeTab === 'collections') {
         const response = await apiService.getNFTCollections();
         setNftCollections(response.data);
@@ -84,6 +118,21 @@ export default function AdminDashboard() {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await apiService.getWhitelistEntries({ ...filters, limit: WHITELIST_PAGE_SIZE, cursor: nextCursor });
+      setWhitelistEntries((entries) => [...entries, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error loading entries:', error);
+      setMessage({ type: 'error', text: 'Failed to load more entries' });
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleLogout = () => {
     localStorage.removeItem('admin_token');
     navigate('/admin/login');
@@ -122,6 +171,17 @@ export default function AdminDashboard() {
     }
   };
 
+  const handleDownloadCSV = async () => {
+    try {
+      const response = await apiService.downloadWhitelistCSV();
+      downloadFile(response.data, 'whitelist.csv');
+      setMessage({ type: 'success', text: 'Downloaded whitelist as CSV' });
+    } catch (error) {
+      console.error('Download error:', error);
+      setMessage({ type: 'error', text: 'Failed to download CSV' });
+    }
+  };
+
   const handleDownloadAddresses = async () => {
     try {
       const response = await apiService.downloadWalletAddresses();
@@ -161,7 +221,7 @@ export default function AdminDashboard() {
   };
 
   const handleClearWhitelist = async () => {
-    if (!confirm(`Are you sure you want to clear ALL ${whitelistEntries.length} whitelist entries? This action cannot be undone!`)) return;
+    if (!confirm(`Are you sure you want to clear ALL ${stats?.total ?? 0} whitelist entries? This action cannot be undone!`)) return;
     
     try {
       const response = await apiService.clearWhitelist();
@@ -213,11 +273,6 @@ export default function AdminDashboard() {
     }
   };
 
-  const filteredEntries = whitelistEntries.filter(entry =>
-    entry.full_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    entry.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    entry.wallet_address.toLowerCase().includes(searchTerm.toLowerCase())
-  );
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-gray-900 via-black to-gray-900 text-white">
@@ -285,8 +340,19 @@ export default function AdminDashboard() {
                 <div>
                   <CardTitle className="text-2xl text-amber-400">Whitelist Entries</CardTitle>
                   <CardDescription className="text-gray-300">
-                    Total entries: {whitelistEntries.length}
+                    Total entries: {stats?.total ?? 0}
+                    {stats && (
+                      <>
+                        {' · '}Last 24h: {stats.signups_per_hour.reduce((sum, h) => sum + h.count, 0)}
+                        {' · '}Collections: {stats.collections}
+                      </>
+                    )}
                   </CardDescription>
+                  {stats && Object.keys(stats.countries).length > 0 && (
+                    <p className="text-sm text-gray-400 mt-1">
+                      Top countries: {Object.entries(stats.countries).slice(0, 5).map(([country, count]) => `${country} (${count})`).join(', ')}
+                    </p>
+                  )}
                 </div>
                 <div className="flex gap-2">
                   <Button
@@ -303,6 +369,13 @@ export default function AdminDashboard() {
                     <Download className="mr-2 h-4 w-4" />
                     TXT
                   </Button>
+                  <Button
+                    onClick={handleDownloadCSV}
+                    className="bg-teal-600 hover:bg-teal-700"
+                  >
+                    <Download className="mr-2 h-4 w-4" />
+                    CSV
+                  </Button>
                   <Button
                     onClick={handleDownloadAddresses}
                     className="bg-purple-600 hover:bg-purple-700"
@@ -313,7 +386,7 @@ export default function AdminDashboard() {
                   <Button
                     onClick={handleClearWhitelist}
                     className="bg-red-600 hover:bg-red-700"
-                    disabled={whitelistEntries.length === 0}
+                    disabled={!stats || stats.total === 0}
                   >
                     <Trash2 className="mr-2 h-4 w-4" />
                     Clear All
@@ -326,7 +399,7 @@ export default function AdminDashboard() {
                 <div className="relative">
                   <Search className="absolute left-3 top-3 h-4 w-4 text-gray-400" />
                   <Input
-                    placeholder="Search by name, email, or wallet address..."
+                    placeholder="Search by email domain (@example.com), wallet prefix (rAbc...) or country..."
                     value={searchTerm}
                     onChange={(e) => setSearchTerm(e.target.value)}
                     className="pl-10 bg-gray-900/50 border-amber-500/30 text-white placeholder:text-gray-500"
@@ -338,7 +411,7 @@ export default function AdminDashboard() {
                 <div className="flex justify-center items-center py-12">
                   <Loader2 className="h-8 w-8 animate-spin text-amber-500" />
                 </div>
-              ) : filteredEntries.length === 0 ? (
+              ) : whitelistEntries.length === 0 ? (
                 <div className="text-center py-12 text-gray-400">
                   No whitelist entries found
                 </div>
@@ -356,7 +429,7 @@ export default function AdminDashboard() {
                       </tr>
                     </thead>
                     <tbody>
-                      {filteredEntries.map((entry) => (
+                      {whitelistEntries.map((entry) => (
                         <tr key={entry.id} className="border-b border-gray-800 hover:bg-gray-900/50">
                           <td className="p-3 text-white">{entry.full_name}</td>
                           <td className="p-3 text-gray-300">{entry.email}</td>
@@ -370,6 +443,22 @@ export default function AdminDashboard() {
                   </table>
                 </div>
               )}
+
+              {!loading && (
+                <div className="flex justify-between items-center mt-4 text-sm text-gray-400">
+                  <span>Showing {whitelistEntries.length} of {filteredTotal ?? stats?.total ?? 0}</span>
+                  {nextCursor && (
+                    <Button
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
+                      className="bg-gray-800 hover:bg-gray-700"
+                    >
+                      {loadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+                      Load more
+                    </Button>
+                  )}
+                </div>
+              )}
             </CardContent>
           </Card>
         )}
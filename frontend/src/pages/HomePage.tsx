@@ -147,9 +147,11 @@ export default function HomePage() {
                       </div>
                       {nftData && (
                         <div className="mt-3 pt-3 border-t border-green-500/30">
-                          <p className="text-sm text-gray-300">
-                            Total NFTs: <span className="text-white font-bold">{nftData.total_nfts}</span>
-                          </p>
+                          {nftData.total_nfts !== null && (
+                            <p className="text-sm text-gray-300">
+                              Total NFTs: <span className="text-white font-bold">{nftData.total_nfts}</span>
+                            </p>
+                          )}
                           <p className="text-sm text-gray-300">
                             Tracked NFTs: <span className="text-amber-400 font-bold">{nftData.tracked_nfts?.length || 0}</span>
                           </p>
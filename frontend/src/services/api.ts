@@ -69,7 +69,7 @@ export interface Token {
 
 export interface NFTVerifyResponse {
   wallet_address: string;
-  total_nfts: number;
+  total_nfts: number | null;
   tracked_nfts: Array<{
     nft_id: string;
     issuer: string;
@@ -111,12 +111,31 @@ export interface AddAdminRequest {
   role: string;
 }
 
+export interface AdminStats {
+  total: number;
+  collections: number;
+  countries: Record<string, number>;
+  signups_per_hour: Array<{
+    hour: string;
+    count: number;
+  }>;
+}
+
+export interface WhitelistFilters {
+  country?: string;
+  email_domain?: string;
+  wallet_prefix?: string;
+}
+
 export const apiService = {
   createWhitelistEntry: (data: WhitelistCreate) =>
     api.post<WhitelistEntry>('/api/whitelist', data),
 
-  getWhitelistEntries: () =>
-    api.get<WhitelistEntry[]>('/api/whitelist'),
+  getWhitelistEntries: (params: WhitelistFilters & { limit?: number; cursor?: string } = {}) =>
+    api.get<WhitelistEntry[]>('/api/whitelist', { params }),
+
+  getWhitelistCount: (params: WhitelistFilters = {}) =>
+    api.get<{ count: number }>('/api/whitelist/count', { params }),
 
   adminLogin: (credentials: AdminLogin) =>
     api.post<Token>('/api/admin/login', credentials),
@@ -127,6 +146,9 @@ export const apiService = {
   verifySignature: (data: VerifyRequest) =>
     api.post<Token>('/api/auth/verify', data),
 
+  getAdminStats: (hours = 24) =>
+    api.get<AdminStats>('/api/admin/stats', { params: { hours } }),
+
   getAdminWallets: () =>
     api.get<AdminWallet[]>('/api/admin/wallets'),
 
@@ -145,6 +167,9 @@ export const apiService = {
   downloadWalletAddresses: () =>
     api.get('/api/admin/download/addresses', { responseType: 'blob' }),
 
+  downloadWhitelistCSV: () =>
+    api.get('/api/admin/download/csv', { responseType: 'blob' }),
+
   createNFTCollection: (data: NFTCollectionCreate) =>
     api.post<NFTCollection>('/api/collections', data),
 